@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Fake `exiftool`, which reports the first line of a file as camera model.
+
+Supports reading a single file from stdin (`-j -l -`) and reading the paths
+of multiple files from an argument file on stdin (`-j -l -@ -`).
+Files starting with `corrupt` are reported as errors, like files `exiftool`
+cannot parse. Missing files are only reported on stderr. Lines of the argument
+file starting with `-` are options, which are ignored.
+
+The behaviour is configured using environment variables:
+
+* `FAKE_EXIFTOOL_LATENCY`: seconds to wait per file (default: 0)
+* `FAKE_EXIFTOOL_JITTER`: maximum of a random delay added to the latency (default: 0)
+* `FAKE_EXIFTOOL_FAILURE_RATE`: probability of reporting a file as corrupt (default: 0)
+* `FAKE_EXIFTOOL_TAGS`: number of additional tags per file (default: 0)
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+LATENCY = float(os.environ.get('FAKE_EXIFTOOL_LATENCY', 0))
+JITTER = float(os.environ.get('FAKE_EXIFTOOL_JITTER', 0))
+FAILURE_RATE = float(os.environ.get('FAKE_EXIFTOOL_FAILURE_RATE', 0))
+TAGS = int(os.environ.get('FAKE_EXIFTOOL_TAGS', 0))
+
+MAX_MODEL_LENGTH = 64
+
+
+def get_exif(path, content):
+    if content.startswith(b'corrupt') or random.random() < FAILURE_RATE:
+        return {'SourceFile': path, 'Error': 'File format error'}
+
+    model = content.split(b'\n', 1)[0][:MAX_MODEL_LENGTH]
+    exif = {
+        'SourceFile': path,
+        'Model': {
+            'desc': 'Camera Model Name',
+            'val': model.decode('utf-8', errors='replace'),
+        },
+    }
+    if path != '-':
+        # tags of the `System` group, which describe the local file
+        stat = os.stat(path)
+        exif['FileName'] = {'desc': 'File Name', 'val': Path(path).name}
+        exif['Directory'] = {
+            'desc': 'Directory',
+            'val': str(Path(path).parent),
+        }
+        exif['FilePermissions'] = {
+            'desc': 'File Permissions',
+            'val': oct(stat.st_mode & 0o777),
+        }
+        exif['FileAccessDate'] = {
+            'desc': 'File Access Date/Time',
+            'val': time.strftime('%Y:%m:%d %H:%M:%S', time.localtime(stat.st_atime)),
+        }
+    for i in range(TAGS):
+        exif[f'Tag{i}'] = {'desc': f'Tag {i}', 'val': 'x' * 64}
+    return exif
+
+
+def main(args):
+    if args[-2:] == ['-@', '-']:
+        lines = [line.rstrip('\n') for line in sys.stdin]
+        paths = [line for line in lines if not line.startswith('-')]
+    else:
+        paths = ['-']
+
+    separator = '['
+    exit_code = 0
+    for path in paths:
+        try:
+            content = (
+                sys.stdin.buffer.read() if path == '-' else Path(path).read_bytes()
+            )
+        except FileNotFoundError:
+            sys.stderr.write(f'Error: File not found - {path}\n')
+            exit_code = 1
+            continue
+
+        time.sleep(LATENCY + random.uniform(0, JITTER))
+        exif = get_exif(path, content)
+        if 'Error' in exif:
+            exit_code = 1
+
+        # mimic the output format of exiftool
+        sys.stdout.write(separator + json.dumps(exif, indent=2))
+        sys.stdout.flush()
+        separator = ',\n'
+    if separator != '[':
+        sys.stdout.write(']\n')
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
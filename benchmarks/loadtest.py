@@ -0,0 +1,342 @@
+"""
+Load test saving models with an `ExifField` from many threads.
+
+Run it from the root of the repository, e.g.
+
+    python -m benchmarks.loadtest --threads 16 --saves 50 --latency 0.1
+
+By default a fake `exiftool` is used, see `benchmarks/fake_exiftool.py`.
+Use `--exiftool exiftool --images <dir>` to run the real binary on real images.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from itertools import cycle
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import django
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+
+from exiffield import failures
+
+FAKE_EXIFTOOL = Path(__file__).parent / 'fake_exiftool.py'
+MIB = 1024 * 1024
+CAMERAS = [b'DMC-GX7', b'E-M5MarkII', b'X-T3', b'ILCE-7M3']
+
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--saves', type=int, default=50, help='saves per thread')
+    parser.add_argument(
+        '--operation',
+        choices=['create', 'update'],
+        default='create',
+        help='create new objects or replace the file of existing objects',
+    )
+    parser.add_argument(
+        '--exiftool',
+        default=str(FAKE_EXIFTOOL),
+        help='exiftool executable (default: fake exiftool)',
+    )
+    parser.add_argument(
+        '--images',
+        type=Path,
+        help='directory of files to upload (default: random content)',
+    )
+    parser.add_argument('--file-size', type=int, default=64 * 1024)
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        help='maximum number of interactive exiftool processes',
+    )
+    parser.add_argument(
+        '--latency',
+        type=float,
+        default=0.05,
+        help='seconds per file of the fake exiftool',
+    )
+    parser.add_argument(
+        '--jitter',
+        type=float,
+        default=0,
+        help='maximum random seconds added to the latency',
+    )
+    parser.add_argument(
+        '--failure-rate',
+        type=float,
+        default=0,
+        help='probability of the fake exiftool to fail',
+    )
+    parser.add_argument(
+        '--tags',
+        type=int,
+        default=0,
+        help='additional tags reported by the fake exiftool',
+    )
+    parser.add_argument(
+        '--tracemalloc',
+        action='store_true',
+        help='report the peak of python allocations (slows down the test)',
+    )
+    parser.add_argument('--json', action='store_true', help='print a json report')
+    parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='show failed extractions',
+    )
+    return parser.parse_args(args)
+
+
+def configure(options: argparse.Namespace, tmpdir: Path) -> None:
+    """
+    Configure django to use a SQLite database within `tmpdir`.
+    """
+    os.environ.update(
+        {
+            'FAKE_EXIFTOOL_LATENCY': str(options.latency),
+            'FAKE_EXIFTOOL_JITTER': str(options.jitter),
+            'FAKE_EXIFTOOL_FAILURE_RATE': str(options.failure_rate),
+            'FAKE_EXIFTOOL_TAGS': str(options.tags),
+        }
+    )
+    exif_settings: Dict[str, Any] = {'EXIFFIELD_EXIFTOOL': options.exiftool}
+    if options.concurrency:
+        exif_settings['EXIFFIELD_CONCURRENCY'] = {
+            'interactive': options.concurrency,
+            'bulk': options.concurrency,
+        }
+
+    settings.configure(
+        DATABASES={
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': str(tmpdir / 'db.sqlite3'),
+                # wait for concurrent writers instead of failing
+                'OPTIONS': {'timeout': 60},
+            },
+        },
+        INSTALLED_APPS=['exiffield', 'benchmarks'],
+        MEDIA_ROOT=str(tmpdir / 'media'),
+        LOGGING={
+            'version': 1,
+            'disable_existing_loggers': False,
+            'loggers': {
+                # failed extractions are counted as missing exif
+                'exiffield': {'level': 'DEBUG' if options.verbose else 'CRITICAL'},
+            },
+        },
+        **exif_settings,
+    )
+    django.setup()
+    call_command('migrate', run_syncdb=True, verbosity=0)
+
+
+def iter_contents(options: argparse.Namespace) -> Iterator[bytes]:
+    """
+    Return the content of the files to upload.
+    """
+    if options.images:
+        paths = sorted(path for path in options.images.iterdir() if path.is_file())
+        if not paths:
+            raise SystemExit(f'No files found in {options.images}')
+        return cycle([path.read_bytes() for path in paths])
+    # random content avoids that files are recognized by their fingerprint,
+    # the fake exiftool reports the first line as camera model
+    return iter(
+        lambda: random.choice(CAMERAS) + b'\n' + os.urandom(options.file_size),
+        None,
+    )
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Return the percentile of the values using the nearest-rank method.
+    """
+    if not values:
+        return math.nan
+    values = sorted(values)
+    rank = max(0, math.ceil(percent / 100 * len(values)) - 1)
+    return values[rank]
+
+
+def get_max_rss() -> float:
+    """
+    Return the maximum resident set size of this process in MiB.
+    """
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        return math.nan
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # bytes on macOS, KiB on Linux
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return usage.ru_maxrss * scale / MIB
+
+
+class Worker(threading.Thread):
+    def __init__(
+        self,
+        number: int,
+        options: argparse.Namespace,
+        contents: Iterator[bytes],
+        lock: threading.Lock,
+        barrier: threading.Barrier,
+    ) -> None:
+        super().__init__(daemon=True)
+        self.number = number
+        self.options = options
+        self.contents = contents
+        self.lock = lock
+        self.barrier = barrier
+        self.latencies: List[float] = []
+        self.missing_exif = 0
+        self.errors: List[str] = []
+
+    def get_file(self, i: int) -> SimpleUploadedFile:
+        with self.lock:
+            content = next(self.contents)
+        return SimpleUploadedFile(f'image_{self.number}_{i}.jpg', content)
+
+    def setup(self) -> Any:
+        """
+        Return the object to save, stored already when updating.
+        """
+        from .models import Image
+
+        img = Image(image=self.get_file(0))
+        if self.options.operation == 'update':
+            img.save()
+        return img
+
+    def save(self, img: Any) -> None:
+        """
+        Save new files and record the latencies.
+        """
+        from .models import Image
+
+        for i in range(self.options.saves):
+            if self.options.operation == 'create':
+                img = Image()
+            img.image = self.get_file(i + 1)
+
+            start = time.perf_counter()
+            try:
+                img.save()
+            except Exception as e:
+                self.errors.append(repr(e))
+                continue
+            self.latencies.append(time.perf_counter() - start)
+            if not img.exif or failures.get_failure(img.exif):
+                self.missing_exif += 1
+
+    def run(self) -> None:
+        try:
+            img = self.setup()
+        except Exception:
+            # do not let the other threads wait forever
+            self.barrier.abort()
+            connection.close()
+            raise
+
+        try:
+            self.barrier.wait()
+            self.save(img)
+        finally:
+            connection.close()
+
+
+def run(options: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Save models from many threads and return the measurements.
+    """
+    lock = threading.Lock()
+    contents = iter_contents(options)
+    barrier = threading.Barrier(options.threads + 1)
+    workers = [
+        Worker(number, options, contents, lock, barrier)
+        for number in range(options.threads)
+    ]
+    for worker in workers:
+        worker.start()
+
+    if options.tracemalloc:
+        tracemalloc.start()
+    # start all threads at once, after the objects to update have been created
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    duration = time.perf_counter() - start
+
+    latencies = [latency for worker in workers for latency in worker.latencies]
+    errors = [error for worker in workers for error in worker.errors]
+    report = {
+        'threads': options.threads,
+        'saves': len(latencies),
+        'errors': len(errors),
+        'missing_exif': sum(worker.missing_exif for worker in workers),
+        'duration': duration,
+        'throughput': len(latencies) / duration if duration else math.nan,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'max': max(latencies, default=math.nan),
+        'max_rss': get_max_rss(),
+    }
+    if options.tracemalloc:
+        report['tracemalloc_peak'] = tracemalloc.get_traced_memory()[1] / MIB
+        tracemalloc.stop()
+    if errors:
+        report['first_error'] = errors[0]
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"threads           {report['threads']}",
+        f"saves             {report['saves']}",
+        f"errors            {report['errors']}",
+        f"missing exif      {report['missing_exif']}",
+        f"duration          {report['duration']:.2f} s",
+        f"throughput        {report['throughput']:.1f} saves/s",
+        f"latency p50       {report['p50'] * 1000:.1f} ms",
+        f"latency p95       {report['p95'] * 1000:.1f} ms",
+        f"latency p99       {report['p99'] * 1000:.1f} ms",
+        f"latency max       {report['max'] * 1000:.1f} ms",
+        f"max rss           {report['max_rss']:.1f} MiB",
+    ]
+    if 'tracemalloc_peak' in report:
+        lines.append(f"tracemalloc peak  {report['tracemalloc_peak']:.1f} MiB")
+    if 'first_error' in report:
+        lines.append(f"first error       {report['first_error']}")
+    return '\n'.join(lines)
+
+
+def main(args: List[str]) -> None:
+    options = parse_args(args)
+    with tempfile.TemporaryDirectory(prefix='exiffield-loadtest-') as tmpdir:
+        configure(options, Path(tmpdir))
+        report = run(options)
+
+    if options.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
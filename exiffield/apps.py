@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class ExifFieldConfig(AppConfig):
+    name = 'exiffield'
+    verbose_name = 'Exif'
+    default_auto_field = 'django.db.models.AutoField'
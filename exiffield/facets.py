@@ -0,0 +1,138 @@
+import datetime
+from collections import Counter
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Type
+
+from django.apps import apps
+from django.db import models, transaction
+from django.db.models import Count, F
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .fields import ExifField
+
+KeyFunc = Callable[[Any], Optional[str]]
+
+
+def default_key(value: Any) -> Optional[str]:
+    """
+    Return the facet value for the given value of a denormalized field.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, Enum):
+        value = value.value
+    return str(value)[:255]
+
+
+def month(value: Any) -> Optional[str]:
+    """
+    Return the month of a date, e.g. `2018-03`.
+    """
+    if not isinstance(value, datetime.date):
+        return None
+    return value.strftime('%Y-%m')
+
+
+def is_installed() -> bool:
+    return apps.is_installed('exiffield')
+
+
+def _get_facet_model() -> Type[models.Model]:
+    return apps.get_model('exiffield', 'ExifFacet')
+
+
+def get_facets(model: Type[models.Model], field: str) -> Dict[str, int]:
+    """
+    Return the number of objects per value of a denormalized field.
+    """
+    facets = _get_facet_model().objects.filter(
+        model=model._meta.label_lower,
+        field=field,
+        count__gt=0,
+    )
+    return dict(facets.values_list('value', 'count'))
+
+
+def update_facets(
+    model: Type[models.Model],
+    field: str,
+    counts: Dict[str, int],
+) -> None:
+    """
+    Add the given counts to the facets of a denormalized field.
+    """
+    facet_model = _get_facet_model()
+    for value, delta in counts.items():
+        if not delta:
+            continue
+
+        facets = facet_model.objects.filter(
+            model=model._meta.label_lower,
+            field=field,
+            value=value,
+        )
+        with transaction.atomic():
+            if facets.update(count=F('count') + delta) or delta < 0:
+                continue
+
+            _, created = facet_model.objects.get_or_create(
+                model=model._meta.label_lower,
+                field=field,
+                value=value,
+                defaults={'count': delta},
+            )
+            if not created:
+                # created concurrently
+                facets.update(count=F('count') + delta)
+
+
+def get_keys(
+    exif_field: 'ExifField',
+    instance: models.Model,
+) -> Dict[str, Optional[str]]:
+    """
+    Return the facet values of all loaded facet fields of the instance.
+    """
+    keys = {}
+    for field, key_func in exif_field.facets.items():
+        attname = instance._meta.get_field(field).attname
+        if attname in instance.__dict__:
+            keys[field] = key_func(instance.__dict__[attname])
+    return keys
+
+
+def count_keys(
+    queryset: models.QuerySet,
+    field: str,
+    key_func: KeyFunc,
+) -> Counter:
+    """
+    Return the number of rows per facet value within the queryset.
+    """
+    counts: Counter = Counter()
+    rows = queryset.order_by().values_list(field).annotate(count=Count('pk'))
+    for value, count in rows:
+        key = key_func(value)
+        if key is not None:
+            counts[key] += count
+    return counts
+
+
+def rebuild_facets(model: Type[models.Model]) -> None:
+    """
+    Recalculate all facets of the given model from the database.
+    """
+    from .fields import get_exif_fields
+
+    facet_model = _get_facet_model()
+    label = model._meta.label_lower
+    with transaction.atomic():
+        facet_model.objects.filter(model=label).delete()
+
+        for exif_field in get_exif_fields(model):
+            for field, key_func in exif_field.facets.items():
+                counts = count_keys(model._default_manager.all(), field, key_func)
+                facet_model.objects.bulk_create(
+                    facet_model(model=label, field=field, value=key, count=count)
+                    for key, count in counts.items()
+                )
@@ -0,0 +1,55 @@
+import time
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+from .getters import ExifType
+
+FAILURE_KEY = 'ExifFailure'
+
+DEFAULT_RETRY_DELAY = 60
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+def get_failure(exif_data: Optional[ExifType]) -> Optional[Dict[str, Any]]:
+    """
+    Return the failure recorded within the given exif data.
+    """
+    if not exif_data:
+        return None
+    return exif_data.get(FAILURE_KEY)
+
+
+def is_blocked(failure: Optional[Dict[str, Any]]) -> bool:
+    """
+    Return whether the extraction should not be retried yet.
+    """
+    if failure is None:
+        return False
+    if failure['permanent']:
+        return True
+    return failure['retry_at'] > time.time()
+
+
+def record_failure(
+    previous: Optional[Dict[str, Any]],
+    reason: str,
+) -> Dict[str, Any]:
+    """
+    Return a failure following the `previous` failure of the same file.
+
+    Every failure doubles the delay until the extraction is retried.
+    After `EXIFFIELD_MAX_ATTEMPTS` failures, the extraction is not retried
+    anymore unless it is forced.
+    """
+    retry_delay = getattr(settings, 'EXIFFIELD_RETRY_DELAY', DEFAULT_RETRY_DELAY)
+    max_attempts = getattr(settings, 'EXIFFIELD_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+
+    attempts = (previous or {}).get('attempts', 0) + 1
+    return {
+        'desc': 'Exif Failure',
+        'val': reason,
+        'attempts': attempts,
+        'retry_at': time.time() + retry_delay * 2 ** (attempts - 1),
+        'permanent': attempts >= max_attempts,
+    }
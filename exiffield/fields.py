@@ -1,26 +1,119 @@
+import hashlib
 import json
 import logging
+import os
 import shutil
 import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from itertools import islice
 from pathlib import Path
-from typing import Generator, List
+from typing import (
+    IO,
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
+from django.conf import settings
 from django.core import checks, exceptions
 from django.db import models
 from django.db.models.fields.files import FieldFile
-from django.db.models.signals import post_init, pre_save
+from django.db.models.query import ModelIterable
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
 from jsonfield import JSONField
 
+from . import facets, failures
 from .exceptions import ExifError
+from .getters import ExifType
+from .scheduler import Priority, get_scheduler
 
 logger = logging.getLogger(__name__)
 
+FINGERPRINT_KEY = 'FileFingerprint'
+MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+CHUNK_SIZE = 100
 
-def get_exif(file_: FieldFile) -> str:
+# keys reported by `exiftool` for files, which could not be extracted
+ERROR_KEYS = {'Error', 'SourceFile', 'ExifToolVersion'}
+
+# keys of the `System` group reported by `exiftool` for paths, which describe the
+# local copy (e.g. absolute paths on the server) rather than the content of a file
+LOCAL_FILE_KEYS = {
+    'Directory',
+    'FileAccessDate',
+    'FileAttributes',
+    'FileBlockCount',
+    'FileBlockSize',
+    'FileCreateDate',
+    'FileDeviceID',
+    'FileDeviceNumber',
+    'FileGroupID',
+    'FileHardLinks',
+    'FileInodeChangeDate',
+    'FileInodeNumber',
+    'FileModifyDate',
+    'FilePermissions',
+    'FileUserID',
+}
+
+# storage options of `ExifField`
+INLINE = 'inline'
+SIDECAR = 'sidecar'
+
+Source = Union[FieldFile, str, Path]
+
+
+class ExifFailure(dict):
+    """
+    Empty exif data of a file, which could not be extracted.
+
+    Transient failures, e.g. a missing `exiftool`, are not caused by the file.
+    """
+
+    def __init__(self, reason: str, transient: bool = False) -> None:
+        super().__init__()
+        self.reason = reason
+        self.transient = transient
+
+
+def _check_exif(exif_data: ExifType) -> ExifType:
+    """
+    Return a failure, if `exiftool` could not extract any exif data.
+
+    Output containing an `Error` along with extracted tags is kept.
+    """
+    if not exif_data:
+        return ExifFailure('exiftool did not return any exif data')
+    if 'Error' in exif_data and set(exif_data) <= ERROR_KEYS:
+        error = exif_data['Error']
+        if isinstance(error, dict):
+            error = error.get('val', error)
+        return ExifFailure(str(error))
+    return exif_data
+
+
+def get_exiftool_path() -> Optional[str]:
+    """
+    Return the path of the `exiftool` executable set in `EXIFFIELD_EXIFTOOL`.
+    """
+    return shutil.which(getattr(settings, 'EXIFFIELD_EXIFTOOL', 'exiftool'))
+
+
+def get_exif(file_: FieldFile) -> bytes:
     """
     Use exiftool to extract exif data from the given file field.
     """
-    exiftool_path = shutil.which('exiftool')
+    exiftool_path = get_exiftool_path()
     if not exiftool_path:
         raise ExifError('Could not find `exiftool`')
 
@@ -28,19 +121,648 @@ def get_exif(file_: FieldFile) -> str:
         # pipe file content to exiftool
         fo = file_._file
         fo.seek(0)
+        content = fo.read()
     else:
-        fo = file_.open()
+        with file_.storage.open(file_.name, 'rb') as fo:
+            content = fo.read()
 
     process = subprocess.run(
         [exiftool_path, '-j', '-l', '-'],
         check=True,
-        input=fo.read(),
+        input=content,
         stdout=subprocess.PIPE,
     )
     return process.stdout
 
 
-class ExifField(JSONField):
+def get_checksum(file_: FieldFile) -> str:
+    """
+    Return the SHA1 checksum of the content of the given file field.
+    """
+    checksum = hashlib.sha1()
+    if not file_._committed:
+        # the content of new files is at hand
+        for chunk in file_._file.chunks():
+            checksum.update(chunk)
+        return checksum.hexdigest()
+
+    with file_.storage.open(file_.name, 'rb') as fo:
+        for chunk in fo.chunks():
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def get_modified_time(file_: FieldFile) -> Optional[str]:
+    """
+    Return the modification time of a stored file, if supported by the storage.
+    """
+    if not file_._committed:
+        return None
+
+    try:
+        return file_.storage.get_modified_time(file_.name).isoformat()
+    except NotImplementedError:
+        return None
+
+
+def get_fingerprint(file_: FieldFile) -> Dict[str, Any]:
+    """
+    Return a fingerprint to identify the content of the given file field.
+
+    Stored files are identified by their size and modification time, which only
+    requires metadata of the storage. The checksum is only calculated for new
+    files, since their content is at hand.
+    """
+    fingerprint = {
+        'desc': 'File Fingerprint',
+        'num': file_.size,
+        'val': get_modified_time(file_),
+    }
+    if not file_._committed:
+        fingerprint['checksum'] = get_checksum(file_)
+    return fingerprint
+
+
+def _try_fingerprint(file_: FieldFile) -> Optional[Dict[str, Any]]:
+    """
+    Return the fingerprint of the given file or `None`, if it cannot be read.
+    """
+    try:
+        return get_fingerprint(file_)
+    except Exception:
+        logger.warning('Could not fingerprint %s', file_.name, exc_info=True)
+        return None
+
+
+def parse_exif(lines: Iterable[bytes]) -> Generator[ExifType, None, None]:
+    """
+    Parse the JSON output of `exiftool` incrementally.
+
+    `exiftool` writes each top-level object of the JSON array as a block of
+    lines, which ends with a line starting with `}`. Hence, every object can be
+    decoded as soon as it has been written.
+    Any other output is decoded once all lines have been read.
+    """
+    decoder = json.JSONDecoder()
+    buffer: List[bytes] = []
+    for line in lines:
+        buffer.append(line)
+        if not line.startswith(b'}'):
+            continue
+
+        text = b''.join(buffer).decode('utf-8').lstrip('[,\n\r\t ')
+        try:
+            exif_data, _ = decoder.raw_decode(text)
+        except json.JSONDecodeError:
+            # not a top-level object, continue reading
+            continue
+        buffer = []
+        yield exif_data
+
+    rest = b''.join(buffer).decode('utf-8').strip().lstrip('[,').rstrip(']')
+    if rest:
+        yield from json.loads(f'[{rest}]')
+
+
+def _get_local_path(file_: Source) -> Optional[str]:
+    """
+    Return the path of the file on the local filesystem, if available.
+    """
+    if isinstance(file_, (str, Path)):
+        return str(file_)
+
+    if not file_._committed:
+        try:
+            # e.g. `TemporaryUploadedFile`
+            return file_._file.temporary_file_path()
+        except AttributeError:
+            return None
+
+    try:
+        return file_.path
+    except NotImplementedError:
+        # remote storage
+        return None
+
+
+def _extract_local_files(
+    paths: Dict[str, List[Source]],
+    priority: Priority,
+) -> Generator[Tuple[Source, ExifType], None, None]:
+    """
+    Extract exif data of all given local files using a single `exiftool` process.
+    """
+    exiftool_path = get_exiftool_path()
+    if not exiftool_path:
+        raise ExifError('Could not find `exiftool`')
+
+    with get_scheduler().slot(priority):
+        # pass the paths as an argument file to avoid exceeding the command line limit
+        process = subprocess.Popen(
+            [exiftool_path, '-j', '-l', '-@', '-'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        yield from _read_local_files(process, paths)
+
+    # files missing from the output, e.g. because `exiftool` was interrupted,
+    # are not necessarily broken
+    failure = ExifFailure('exiftool did not return any exif data', transient=True)
+    for files in paths.values():
+        for file_ in files:
+            yield file_, failure
+
+
+def _read_local_files(
+    process: subprocess.Popen,
+    paths: Dict[str, List[Source]],
+) -> Generator[Tuple[Source, ExifType], None, None]:
+    """
+    Pass the paths to `exiftool` and yield the extracted exif data.
+    """
+    # `exiftool` reports the path as passed in `SourceFile`
+    arguments = {_get_argument(path): path for path in paths}
+    with process:
+        stdin: IO[bytes] = process.stdin  # type: ignore
+        stdin.write(''.join(f'{argument}\n' for argument in arguments).encode('utf-8'))
+        stdin.close()
+
+        for exif_data in parse_exif(process.stdout):  # type: ignore
+            source_file = arguments.get(str(exif_data.pop('SourceFile', '')), '')
+            for key in LOCAL_FILE_KEYS:
+                exif_data.pop(key, None)
+            # every path is passed once, even if it is shared by several files
+            for file_ in paths.pop(source_file, []):
+                yield file_, _check_exif(dict(exif_data))
+
+
+def _get_argument(path: str) -> str:
+    """
+    Return the line of the argument file for the given path.
+
+    Lines starting with `-` are options, hence relative paths are prefixed.
+    """
+    if os.path.isabs(path):
+        return path
+    return os.path.join('.', path)
+
+
+def _get_uploaded_exif(file_: Source) -> Optional[ExifType]:
+    """
+    Return exif data, which has been extracted while the file was uploaded.
+
+    see `exiffield.uploadhandler`
+    """
+    if isinstance(file_, (str, Path)) or file_._committed:
+        return None
+
+    exif_data = getattr(file_._file, 'exif', None)
+    if exif_data is None:
+        return None
+    return _check_exif(dict(exif_data))
+
+
+def _extract_piped_file(file_: FieldFile, priority: Priority) -> ExifType:
+    """
+    Extract exif data of the given file by piping its content to `exiftool`.
+    """
+    uploaded_exif = _get_uploaded_exif(file_)
+    if uploaded_exif is not None:
+        return uploaded_exif
+
+    try:
+        with get_scheduler().slot(priority):
+            exif_json = get_exif(file_)
+        exif_data = next(parse_exif(exif_json.splitlines(keepends=True)), {})
+    except Exception as e:
+        logger.exception('Could not read metainformation from file: %s', file_.name)
+        return ExifFailure(str(e), transient=isinstance(e, ExifError))
+
+    exif_data.pop('SourceFile', None)
+    return _check_exif(exif_data)
+
+
+def _partition_files(
+    files: List[Source],
+) -> Tuple[List[Tuple[Source, ExifType]], Dict[str, List[Source]], List[Source]]:
+    """
+    Split files into files with uploaded exif data, local files and all others.
+    """
+    uploaded = []
+    paths: Dict[str, List[Source]] = {}
+    piped = []
+    for file_ in files:
+        uploaded_exif = _get_uploaded_exif(file_)
+        if uploaded_exif is not None:
+            uploaded.append((file_, uploaded_exif))
+            continue
+
+        path = _get_local_path(file_)
+        if path is None:
+            piped.append(file_)
+        else:
+            paths.setdefault(path, []).append(file_)
+    return uploaded, paths, piped
+
+
+def _spool_files(
+    files: List[Source],
+    paths: Dict[str, List[Source]],
+    directory: str,
+) -> List[Source]:
+    """
+    Write new files to `directory` to extract them along with the local files.
+
+    Return the remaining files, e.g. on a remote storage, which are piped instead.
+    """
+    remaining = []
+    for i, file_ in enumerate(files):
+        if isinstance(file_, (str, Path)) or file_._committed:
+            remaining.append(file_)
+            continue
+
+        path = os.path.join(directory, f'{i}{Path(file_.name).suffix}')
+        try:
+            with open(path, 'wb') as fh:
+                for data in file_._file.chunks():
+                    fh.write(data)
+        except OSError:
+            logger.warning('Could not spool %s', file_.name, exc_info=True)
+            remaining.append(file_)
+            continue
+        paths[path] = [file_]
+    return remaining
+
+
+def _extract_files(
+    paths: Dict[str, List[Source]],
+    priority: Priority,
+) -> Generator[Tuple[Source, ExifType], None, None]:
+    """
+    Extract local files and turn any error into a failure of the remaining files.
+    """
+    try:
+        yield from _extract_local_files(paths, priority)
+    except Exception as e:
+        logger.exception('Could not read metainformation from files')
+        # all yielded files have been removed from `paths`
+        failure = ExifFailure(str(e), transient=isinstance(e, ExifError))
+        for files in paths.values():
+            for file_ in files:
+                yield file_, failure
+
+
+def iter_exif(
+    files: Iterable[Source],
+    chunk_size: int = CHUNK_SIZE,
+    priority: Priority = Priority.BULK,
+) -> Generator[Tuple[Source, ExifType], None, None]:
+    """
+    Extract exif data of the given files and yield them as soon as available.
+
+    Files are processed in chunks. All local files of a chunk are passed to a
+    single `exiftool` process. For bulk work, new files are written to a temporary
+    directory and passed along with them. The content of all other files, e.g. on
+    a remote storage, is piped to `exiftool` concurrently.
+    If no information could be extracted, an empty `ExifFailure` is returned.
+    All `exiftool` processes are admitted by the scheduler using `priority`.
+    """
+    files = iter(files)
+    chunk = list(islice(files, chunk_size))
+    while chunk:
+        uploaded, paths, piped = _partition_files(chunk)
+        yield from uploaded
+
+        with ExitStack() as stack:
+            if priority is Priority.BULK:
+                # interactive work pipes new files concurrently to avoid writing them
+                directory = stack.enter_context(
+                    tempfile.TemporaryDirectory(prefix='exiffield-')
+                )
+                piped = _spool_files(piped, paths, directory)
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                results = [
+                    (file_, executor.submit(_extract_piped_file, file_, priority))
+                    for file_ in piped
+                ]
+                if paths:
+                    yield from _extract_files(paths, priority)
+                for file_, result in results:
+                    yield file_, result.result()
+
+        chunk = list(islice(files, chunk_size))
+
+
+def get_exif_fields(model: Type[models.Model]) -> List['ExifField']:
+    """
+    Return all `ExifField`s of the given model.
+    """
+    return [field for field in model._meta.fields if isinstance(field, ExifField)]
+
+
+def update_model_exif(
+    sender: Type[models.Model],
+    instance: models.Model,
+    **kwargs,
+) -> None:
+    """
+    Load exif data for all synced `ExifField`s of a model at once.
+
+    All changed source files are extracted concurrently, so that the latency
+    of saving a model with several `ExifField`s is close to a single extraction.
+    """
+    bulk_update_exif(sender, [instance], priority=Priority.INTERACTIVE)
+
+
+def bulk_update_exif(
+    model: Type[models.Model],
+    instances: Iterable[models.Model],
+    force: bool = False,
+    priority: Priority = Priority.BULK,
+) -> None:
+    """
+    Load exif data for all synced `ExifField`s of the given instances at once.
+
+    Files, which could not be extracted before, are skipped unless `force` is set.
+    """
+    pending = [
+        (instance, field)
+        for instance in instances
+        for field in get_exif_fields(model)
+        if field.sync
+        and field.requires_update(instance, force=force)
+        and (force or not field.is_failing(instance))
+    ]
+    if not pending:
+        return
+
+    # multiple fields of an instance may share the same source
+    sources: Dict[Tuple[int, str], FieldFile] = {}
+    for instance, field in pending:
+        sources.setdefault(
+            (id(instance), field.source),
+            getattr(instance, field.source),
+        )
+    results = {
+        id(file_): exif_data
+        for file_, exif_data in iter_exif(sources.values(), priority=priority)
+    }
+
+    for instance, field in pending:
+        file_ = sources[(id(instance), field.source)]
+        field.set_exif(instance, results[id(file_)])
+
+
+class LazyExif(dict):
+    """
+    Exif data, which is decoded from its JSON representation on first access.
+
+    It is only handed out by `ExifDataDescriptor` after it has been decoded,
+    since C code, e.g. `json.dumps`, reads the storage of the `dict` directly.
+    """
+
+    # defaults for instances created without `__init__`, e.g. by `pickle`
+    raw = ''
+    source_name: Optional[str] = None
+    _loaded = True
+
+    def __init__(self, raw: str, **load_kwargs) -> None:
+        super().__init__()
+        self.raw = raw
+        self._load_kwargs = load_kwargs
+        self._loaded = False
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+
+        self._loaded = True
+        try:
+            dict.update(self, json.loads(self.raw, **self._load_kwargs))
+        except ValueError:
+            logger.warning('Could not decode exif data: %s', self.raw, exc_info=True)
+
+    def __bool__(self) -> bool:
+        if self._loaded:
+            return len(self) > 0
+        # a non-empty JSON object always contains a quoted key
+        return '"' in self.raw
+
+    def __eq__(self, other: object) -> bool:
+        self._load()
+        if isinstance(other, LazyExif):
+            other._load()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other: object) -> bool:
+        return not self == other
+
+    __hash__ = None  # type: ignore
+
+
+def _load_first(name: str) -> Any:
+    method = getattr(dict, name)
+
+    def inner(self: LazyExif, *args, **kwargs) -> Any:
+        self._load()
+        return method(self, *args, **kwargs)
+
+    inner.__name__ = name
+    return inner
+
+
+for _name in [
+    '__contains__',
+    '__delitem__',
+    '__getitem__',
+    '__ior__',
+    '__iter__',
+    '__len__',
+    '__or__',
+    '__repr__',
+    '__reversed__',
+    '__setitem__',
+    'clear',
+    'copy',
+    'get',
+    'items',
+    'keys',
+    'pop',
+    'popitem',
+    'setdefault',
+    'update',
+    'values',
+]:
+    if hasattr(dict, _name):
+        setattr(LazyExif, _name, _load_first(_name))
+
+
+_lazy = threading.local()
+
+
+@contextmanager
+def decode_lazily() -> Generator[None, None, None]:
+    """
+    Defer decoding exif data loaded from the database within this context.
+    """
+    previous = getattr(_lazy, 'enabled', False)
+    _lazy.enabled = True
+    try:
+        yield
+    finally:
+        _lazy.enabled = previous
+
+
+class LazyExifIterable(ModelIterable):
+    """
+    Yield model instances, whose exif data is decoded on first access.
+
+    Values, e.g. of `values()`, are returned to the caller as they are, hence
+    they are only deferred while model instances are created.
+    """
+
+    def __iter__(self) -> Iterator[models.Model]:
+        instances = super().__iter__()
+        while True:
+            with decode_lazily():
+                instance = next(instances, None)
+            if instance is None:
+                return
+            yield instance
+
+
+class LazyExifQuerySet(models.QuerySet):
+    """
+    QuerySet, which decodes exif data of its model instances on first access.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._iterable_class = LazyExifIterable
+
+
+class ExifDataDescriptor:
+    """
+    Decode exif data loaded from the database, once it is accessed.
+    """
+
+    def __init__(self, field: 'ExifDataField') -> None:
+        self.field = field
+
+    def __get__(self, instance: Optional[models.Model], cls: Any = None) -> Any:
+        if instance is None:
+            return self
+
+        value = self.field.get_stored_value(instance)
+        if isinstance(value, LazyExif):
+            value._load()
+        return value
+
+    def __set__(self, instance: models.Model, value: Any) -> None:
+        instance.__dict__[self.field.attname] = value
+
+
+class ExifDataField(JSONField):
+    """
+    JSONField, which decodes exif data on first access.
+    """
+
+    def contribute_to_class(self, cls: Type[models.Model], name: str, **kwargs) -> None:
+        super().contribute_to_class(cls, name, **kwargs)
+        setattr(cls, self.attname, ExifDataDescriptor(self))
+
+    def get_stored_value(self, instance: models.Model) -> Any:
+        """
+        Return the value of the instance without decoding it.
+        """
+        if self.attname not in instance.__dict__:
+            # deferred field
+            instance.refresh_from_db(fields=[self.attname])
+        return instance.__dict__[self.attname]
+
+    def pre_save(self, model_instance: models.Model, add: bool) -> Any:
+        return self.get_stored_value(model_instance)
+
+    def from_db_value(self, value: Any, expression: Any, connection: Any) -> Any:
+        """
+        Defer decoding of the exif data of model instances until it is accessed.
+        """
+        if (
+            getattr(_lazy, 'enabled', False)
+            and isinstance(value, str)
+            and value.lstrip().startswith('{')
+        ):
+            return LazyExif(value, **self.load_kwargs)
+        return super().from_db_value(value, expression, connection)
+
+    def get_prep_value(self, value: Any) -> Any:
+        """
+        Store exif data, which has not been decoded, without encoding it again.
+        """
+        if isinstance(value, LazyExif) and not value.is_loaded:
+            return value.raw
+        return super().get_prep_value(value)
+
+    def is_unchanged(self, value: Any) -> bool:
+        """
+        Return whether exif data loaded from the database has not been changed.
+
+        Decoded exif data is compared by its encoding, since nested values might
+        have been changed.
+        """
+        if not isinstance(value, LazyExif):
+            return False
+        return not value.is_loaded or self.get_prep_value(value) == value.raw
+
+    def value_to_string(self, obj: models.Model) -> str:
+        return self.get_prep_value(self.get_stored_value(obj))
+
+
+def create_sidecar_model(
+    field: 'ExifField',
+    klass: Type[models.Model],
+) -> Type[models.Model]:
+    """
+    Create a model, which stores the exif data of `field` in a separate table.
+    """
+    name = f'{klass._meta.object_name}_{field.name}'
+    to = f'{klass._meta.app_label}.{klass._meta.object_name}'
+    meta = type(
+        'Meta',
+        (),
+        {
+            'db_table': f'{klass._meta.db_table}_{field.name}',
+            'app_label': klass._meta.app_label,
+            'db_tablespace': klass._meta.db_tablespace,
+            'verbose_name': f'{klass._meta.verbose_name} {field.name}',
+            'apps': klass._meta.apps,
+            # used to access the sidecar of an instance
+            'base_manager_name': 'objects',
+        },
+    )
+    return type(
+        name,
+        (models.Model,),
+        {
+            'Meta': meta,
+            '__module__': klass.__module__,
+            klass._meta.model_name: models.OneToOneField(
+                to,
+                on_delete=models.CASCADE,
+                primary_key=True,
+                related_name=field.sidecar_name,
+            ),
+            'data': ExifDataField(default=dict),
+            'objects': LazyExifQuerySet.as_manager(),
+        },
+    )
+
+
+class ExifField(ExifDataField):
     def __init__(self, *args, **kwargs) -> None:
         """
         Extract fields for denormalized exif values.
@@ -48,10 +770,33 @@ class ExifField(JSONField):
         self.denormalized_fields = kwargs.pop('denormalized_fields', {})
         self.source = kwargs.pop('source', None)
         self.sync = kwargs.pop('sync', True)
+        self.storage = kwargs.pop('storage', INLINE)
+        self.facets = self._get_facet_funcs(kwargs.pop('facets', ()))
+        self.sidecar_model: Optional[Type[models.Model]] = None
         kwargs['editable'] = False
         kwargs['default'] = {}
         super().__init__(*args, **kwargs)
 
+    def deconstruct(self) -> Tuple[str, str, List[Any], Dict[str, Any]]:
+        name, path, args, kwargs = super().deconstruct()
+        if self.storage != INLINE:
+            kwargs['storage'] = self.storage
+        return name, path, args, kwargs
+
+    @staticmethod
+    def _get_facet_funcs(
+        facet_fields: Union[Iterable[str], Dict[str, Optional[facets.KeyFunc]]],
+    ) -> Dict[str, facets.KeyFunc]:
+        """
+        Return a function per facet field, which returns the facet value.
+        """
+        if isinstance(facet_fields, dict):
+            return {
+                field: key_func or facets.default_key
+                for field, key_func in facet_fields.items()
+            }
+        return {field: facets.default_key for field in facet_fields}
+
     def check(self, **kwargs) -> List[checks.CheckMessage]:
         """
         Check if current configuration is valid.
@@ -61,13 +806,51 @@ class ExifField(JSONField):
             errors.extend(self._check_for_exiftool())
             errors.extend(self._check_fields())
             errors.extend(self._check_for_source())
+            errors.extend(self._check_storage())
+            errors.extend(self._check_facets())
         return errors
 
+    def _check_facets(self) -> Generator[checks.CheckMessage, None, None]:
+        """
+        Return errors if facets cannot be maintained.
+        """
+        if not self.facets:
+            return
+
+        if not facets.is_installed():
+            yield checks.Error(
+                f'Facets on {self.model} require `exiffield` to be installed.',
+                hint='Add `exiffield` to `INSTALLED_APPS`.',
+                obj=self,
+                id='exiffield.E010',
+            )
+
+        for fieldname in self.facets:
+            if fieldname not in self.denormalized_fields:
+                yield checks.Error(
+                    f'Facet `{fieldname}` on {self.model} is not denormalized.',
+                    hint='Add the field to `denormalized_fields`.',
+                    obj=self,
+                    id='exiffield.E011',
+                )
+
+    def _check_storage(self) -> Generator[checks.CheckMessage, None, None]:
+        """
+        Return an error if the storage is unknown.
+        """
+        if self.storage not in (INLINE, SIDECAR):
+            yield checks.Error(
+                f'`storage` on {self.model} should be `{INLINE}` or `{SIDECAR}`.',
+                hint='Check the kwargs of `ExifField`',
+                obj=self,
+                id='exiffield.E009',
+            )
+
     def _check_for_exiftool(self) -> Generator[checks.CheckMessage, None, None]:
         """
         Return an error if `exiftool` is not available.
         """
-        if not shutil.which('exiftool'):
+        if not get_exiftool_path():
             yield checks.Error(
                 '`exiftool` not found.',
                 hint='Please install `exiftool.`',
@@ -159,14 +942,205 @@ class ExifField(JSONField):
         """
         super().contribute_to_class(cls, name, **kwargs)
 
+        if not cls._meta.abstract and cls.__module__ != '__fake__':
+            # connected first to update the fingerprint before it is stored
+            post_save.connect(self.commit_fingerprint, sender=cls)
+
+        if self.storage == SIDECAR:
+            # historical models used by migrations must not create another model
+            if not cls._meta.abstract and cls.__module__ != '__fake__':
+                self.sidecar_model = create_sidecar_model(self, cls)
+                post_save.connect(self.save_sidecar, sender=cls)
+
         # Only run post-initialization exif update on non-abstract models
         if not cls._meta.abstract:
             if self.sync:
-                pre_save.connect(self.update_exif, sender=cls)
+                # a single receiver handles all `ExifField`s of the model
+                pre_save.connect(update_model_exif, sender=cls)
 
             # denormalize exif values
             pre_save.connect(self.denormalize_exif, sender=cls)
-            post_init.connect(self.denormalize_exif, sender=cls)
+            post_init.connect(self._init_exif, sender=cls)
+
+            if self.facets and cls.__module__ != '__fake__':
+                post_init.connect(self._init_facets, sender=cls)
+                post_save.connect(self.save_facets, sender=cls)
+                post_delete.connect(self.delete_facets, sender=cls)
+
+    @property
+    def sidecar_name(self) -> str:
+        """
+        Return the name of the relation to the sidecar model.
+        """
+        return f'{self.name}_sidecar'
+
+    @property
+    def _source_name_attname(self) -> str:
+        return f'_{self.attname}_source_name'
+
+    def get_attname_column(self) -> Tuple[str, Optional[str]]:
+        attname, column = super().get_attname_column()
+        if self.storage == SIDECAR:
+            # the exif data is not stored within the table of the model
+            return attname, None
+        return attname, column
+
+    def db_type(self, connection: Any) -> Optional[str]:
+        if self.storage == SIDECAR:
+            return None
+        return super().db_type(connection)
+
+    def get_stored_value(self, instance: models.Model) -> Any:
+        """
+        Return the exif data of the instance without decoding it.
+
+        Exif data stored in a sidecar model is loaded on first access.
+        """
+        if self.storage == SIDECAR and self.attname not in instance.__dict__:
+            instance.__dict__[self.attname] = self.load_sidecar(instance)
+        return super().get_stored_value(instance)
+
+    def load_sidecar(self, instance: models.Model) -> Any:
+        """
+        Return the exif data stored in the sidecar model.
+
+        Use `prefetch_related` with `sidecar_name` to load the exif data of many
+        instances at once.
+        """
+        if instance._state.adding or self.sidecar_model is None:
+            return self.get_default()
+
+        try:
+            exif_data = getattr(instance, self.sidecar_name).__dict__['data']
+        except exceptions.ObjectDoesNotExist:
+            return self.get_default()
+
+        if isinstance(exif_data, LazyExif):
+            exif_data.source_name = instance.__dict__.get(self._source_name_attname)
+        return exif_data
+
+    def get_sidecar(self, instance: models.Model) -> models.Model:
+        """
+        Return a sidecar model instance containing the exif data of `instance`.
+        """
+        assert self.sidecar_model is not None
+        return self.sidecar_model(
+            **{
+                instance._meta.model_name: instance,
+                'data': instance.__dict__[self.attname],
+            }
+        )
+
+    def save_sidecar(
+        self,
+        instance: models.Model,
+        created: bool = False,
+        **kwargs,
+    ) -> None:
+        """
+        Store changed exif data in the sidecar model.
+        """
+        exif_data = instance.__dict__.get(self.attname)
+        if exif_data is None or self.is_unchanged(exif_data):
+            # exif data has not been changed since it has been loaded
+            return
+        if created and not exif_data:
+            # a missing sidecar is loaded as empty exif data
+            return
+
+        sidecar = self.get_sidecar(instance)
+        sidecar.save()
+        # cache relation to avoid querying the exif data again
+        setattr(instance, self.sidecar_name, sidecar)
+
+    @property
+    def _facets_attname(self) -> str:
+        return f'_{self.attname}_facets'
+
+    def _init_facets(self, instance: models.Model, **kwargs) -> None:
+        """
+        Remember the facet values of the instance.
+        """
+        instance.__dict__[self._facets_attname] = facets.get_keys(self, instance)
+
+    def get_facet_changes(
+        self,
+        instance: models.Model,
+        created: bool = False,
+        update_fields: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Return the changes of the facet counts since the instance was last saved.
+
+        The stored facet values are updated, hence the changes are returned only once.
+        """
+        previous = {} if created else instance.__dict__.get(self._facets_attname, {})
+        current = facets.get_keys(self, instance)
+        if update_fields is not None:
+            current = {
+                field: key for field, key in current.items() if field in update_fields
+            }
+
+        changes: Dict[str, Dict[str, int]] = {}
+        for field, key in current.items():
+            if not created and field not in previous:
+                # the field was deferred, the stored value is unknown
+                continue
+
+            old_key = previous.get(field)
+            if old_key == key:
+                continue
+            counts = changes.setdefault(field, {})
+            if old_key is not None:
+                counts[old_key] = counts.get(old_key, 0) - 1
+            if key is not None:
+                counts[key] = counts.get(key, 0) + 1
+
+        instance.__dict__[self._facets_attname] = {**previous, **current}
+        return changes
+
+    def save_facets(
+        self,
+        instance: models.Model,
+        created: bool = False,
+        update_fields: Optional[Iterable[str]] = None,
+        **kwargs,
+    ) -> None:
+        """
+        Update the facet counts with the changed values of the instance.
+        """
+        changes = self.get_facet_changes(instance, created, update_fields)
+        for field, counts in changes.items():
+            facets.update_facets(self.model, field, counts)
+
+    def delete_facets(self, instance: models.Model, **kwargs) -> None:
+        """
+        Remove the stored values of a deleted instance from the facet counts.
+        """
+        previous = instance.__dict__.pop(self._facets_attname, {})
+        for field, key in previous.items():
+            if key is not None:
+                facets.update_facets(self.model, field, {key: -1})
+
+    def _init_exif(self, instance: models.Model, **kwargs) -> None:
+        """
+        Denormalize exif values of new instances.
+        """
+        if self.storage == SIDECAR and self.attname not in instance.__dict__:
+            # the exif data is loaded on access, remember the file it belongs to
+            source = instance.__dict__.get(self.source)
+            instance.__dict__[self._source_name_attname] = getattr(
+                source, 'name', source
+            )
+            return
+
+        exif_data = instance.__dict__.get(self.attname)
+        if isinstance(exif_data, LazyExif) and not exif_data.is_loaded:
+            # loaded from the database, remember the file the exif belongs to
+            source = instance.__dict__.get(self.source)
+            exif_data.source_name = getattr(source, 'name', source)
+            return
+        self.denormalize_exif(instance)
 
     def denormalize_exif(
         self,
@@ -175,11 +1149,29 @@ class ExifField(JSONField):
     ) -> None:
         """
         Update denormalized fields with new exif values.
+
+        Exif data, which has neither been accessed nor changed since it has been
+        loaded from the database, is skipped, since the denormalized fields were
+        stored along with it.
         """
-        exif_data = getattr(instance, self.name)
-        if not exif_data:
+        exif_data = instance.__dict__.get(self.attname)
+        if exif_data is None or (
+            isinstance(exif_data, LazyExif) and not exif_data.is_loaded
+        ):
             return
 
+        for model_field, value in self.get_denormalized_values(instance).items():
+            setattr(instance, model_field, value)
+
+    def get_denormalized_values(self, instance: models.Model) -> Dict[str, Any]:
+        """
+        Return all values, which could be extracted for the denormalized fields.
+        """
+        exif_data = getattr(instance, self.name)
+        if not exif_data or failures.FAILURE_KEY in exif_data:
+            return {}
+
+        values = {}
         for model_field, extract_from_exif in self.denormalized_fields.items():
             value = None
             try:
@@ -195,55 +1187,232 @@ class ExifField(JSONField):
             if not value:
                 continue
 
-            setattr(instance, model_field, value)
+            values[model_field] = value
+        return values
 
-    def update_exif(
+    def requires_update(
         self,
         instance: models.Model,
         force: bool = False,
-        commit: bool = False,
-        **kwargs,
-    ) -> None:
+    ) -> bool:
         """
-        Load exif data from file.
+        Return whether the exif data needs to be extracted from the source.
         """
         file_ = getattr(instance, self.source)
         if not file_:
             # there is no file attached to the FileField
-            return
+            return False
+
+        if (
+            self.storage == SIDECAR
+            and self.attname not in instance.__dict__
+            and not instance._state.adding
+            and file_._committed
+            and not force
+            and instance.__dict__.get(self._source_name_attname) == file_.name
+        ):
+            # the file did not change since the exif data, which has not been
+            # loaded from the sidecar yet, has been stored
+            return False
 
         # check whether extraction of the exif is required
-        exif_data = getattr(instance, self.name, None) or {}
-        has_exif = bool(exif_data)
+        exif_data = self.get_stored_value(instance) or {}
+        if not exif_data or not file_._committed or force:
+            return True
+
+        if (
+            isinstance(exif_data, LazyExif)
+            and not exif_data.is_loaded
+            and exif_data.source_name == file_.name
+            and f'"{failures.FAILURE_KEY}"' not in exif_data.raw
+        ):
+            # neither the file nor the exif data changed since it has been loaded
+            return False
+
+        if failures.get_failure(exif_data):
+            # retry, unless `is_failing`
+            return True
+
         filename = Path(file_.name).name
         exif_for_filename = exif_data.get('FileName', {}).get('val', '')
-        file_changed = exif_for_filename != filename or not file_._committed
-
-        if has_exif and not file_changed and not force:
+        if exif_for_filename == filename:
             # nothing to do since the file has not been changed
+            return False
+
+        # The file might have been renamed by the storage, e.g. using
+        # `get_available_name`. Compare the content to avoid a re-extraction.
+        if not self._has_fingerprint(file_, exif_data):
+            return True
+        self._refresh_fingerprint(file_, exif_data)
+        return False
+
+    def _refresh_fingerprint(self, file_: FieldFile, exif_data: Dict[str, Any]) -> None:
+        """
+        Store the name and the metadata of the stored file.
+
+        Hence, the file is recognized by its metadata without reading it again.
+        """
+        exif_data['FileName'] = {
+            'desc': 'File Name',
+            'val': Path(file_.name).name,
+        }
+        fingerprint = _try_fingerprint(file_)
+        if fingerprint is not None:
+            previous = exif_data.get(FINGERPRINT_KEY) or {}
+            # keep the checksum for storages, which do not report modification times
+            exif_data[FINGERPRINT_KEY] = {**previous, **fingerprint}
+
+    @property
+    def _uncommitted_attname(self) -> str:
+        return f'_{self.attname}_uncommitted'
+
+    def commit_fingerprint(
+        self,
+        instance: models.Model,
+        using: Optional[str] = None,
+        update_fields: Optional[Iterable[str]] = None,
+        **kwargs,
+    ) -> None:
+        """
+        Store the name and metadata of files, which were extracted before commit.
+
+        The storage might have changed the name, e.g. using `get_available_name`.
+        """
+        if not instance.__dict__.pop(self._uncommitted_attname, False):
+            return
+        if update_fields is not None and self.name not in update_fields:
+            return
+
+        file_ = getattr(instance, self.source)
+        exif_data = instance.__dict__.get(self.attname)
+        if not file_ or not file_._committed or not exif_data:
             return
 
+        self._refresh_fingerprint(file_, exif_data)
+        if self.storage != SIDECAR:
+            # the sidecar is saved afterwards
+            manager = instance.__class__._base_manager.using(using)
+            manager.filter(pk=instance.pk).update(**{self.name: exif_data})
+
+    def _has_fingerprint(self, file_: FieldFile, exif_data: Dict[str, Any]) -> bool:
+        """
+        Return whether the content of the file matches the stored fingerprint.
+        """
+        fingerprint = exif_data.get(FINGERPRINT_KEY)
+        if not fingerprint:
+            return False
+
         try:
-            exif_json = get_exif(file_)
+            # compare the metadata first to avoid reading the file
+            if file_.size != fingerprint.get('num'):
+                return False
+            modified_time = fingerprint.get('val')
+            if modified_time and modified_time == get_modified_time(file_):
+                return True
+            checksum = fingerprint.get('checksum')
+            return bool(checksum) and get_checksum(file_) == checksum
         except Exception:
-            logger.exception('Could not read metainformation from file: %s', file_.name)
+            logger.warning(
+                'Could not compare fingerprint of %s', file_.name, exc_info=True
+            )
+            return False
+
+    def set_exif(self, instance: models.Model, exif_data: ExifType) -> bool:
+        """
+        Store the exif data extracted by `exiftool` on the instance.
+
+        Return whether the exif data of the instance has been changed.
+        Failures, which are not transient, are stored along with the fingerprint
+        of the file, so that it is not extracted on every save.
+        """
+        file_ = getattr(instance, self.source)
+        if isinstance(exif_data, ExifFailure):
+            if exif_data.transient:
+                return False
+        elif not exif_data:
+            return False
+
+        fingerprint = _try_fingerprint(file_)
+        if isinstance(exif_data, ExifFailure):
+            if fingerprint is None:
+                # e.g. the file is missing, which is not a failure of the file
+                return False
+            exif_data = self._get_failure_exif(instance, exif_data.reason)
+
+        if 'FileName' not in exif_data or not file_._committed:
+            # If the file is uncommited, exiftool cannot extract the final filename
+            # We guess, that no other file with the same filename exists in
+            # the storage.
+            # In the worst case the exif is extracted twice...
+            exif_data['FileName'] = {
+                'desc': 'File Name',
+                'val': Path(file_.name).name,
+            }
+        if fingerprint is not None:
+            exif_data[FINGERPRINT_KEY] = fingerprint
+        if not file_._committed:
+            # the name and metadata are only known, once the file has been stored
+            instance.__dict__[self._uncommitted_attname] = True
+        setattr(instance, self.name, exif_data)
+        return True
+
+    def _get_failure_exif(self, instance: models.Model, reason: str) -> ExifType:
+        """
+        Return exif data containing the failure to extract the source file.
+        """
+        file_ = getattr(instance, self.source)
+        exif_data = self.get_stored_value(instance) or {}
+        previous = failures.get_failure(exif_data)
+        if previous and not (
+            file_._committed and self._has_fingerprint(file_, exif_data)
+        ):
+            # the previous failure belongs to another file
+            previous = None
+
+        failure = failures.record_failure(previous, reason)
+        logger.warning(
+            'Could not extract exif of %s (attempt %d): %s',
+            file_.name,
+            failure['attempts'],
+            reason,
+        )
+        return {failures.FAILURE_KEY: failure}
+
+    def is_failing(self, instance: models.Model) -> bool:
+        """
+        Return whether a previous extraction of the source file failed recently.
+        """
+        file_ = getattr(instance, self.source)
+        if not file_ or not file_._committed:
+            # new files have not been extracted before
+            return False
+
+        exif_data = self.get_stored_value(instance) or {}
+        if not failures.is_blocked(failures.get_failure(exif_data)):
+            return False
+        # the file might have been replaced
+        return self._has_fingerprint(file_, exif_data)
+
+    def update_exif(
+        self,
+        instance: models.Model,
+        force: bool = False,
+        commit: bool = False,
+        **kwargs,
+    ) -> None:
+        """
+        Load exif data from file.
+        """
+        if not self.requires_update(instance, force=force):
             return
 
-        try:
-            exif_data = json.loads(exif_json)[0]
-        except IndexError:
+        if not force and self.is_failing(instance):
+            return
+
+        file_ = getattr(instance, self.source)
+        exif_data = _extract_piped_file(file_, Priority.INTERACTIVE)
+        if not self.set_exif(instance, exif_data):
             return
-        else:
-            if 'FileName' not in exif_data:
-                # If the file is uncommited, exiftool cannot extract a filenmae
-                # We guess, that no other file with the same filename exists in
-                # the storage.
-                # In the worst case the exif is extracted twice...
-                exif_data['FileName'] = {
-                    'desc': 'File Name',
-                    'val': filename,
-                }
-            setattr(instance, self.name, exif_data)
 
         if commit:
             instance.save()
@@ -0,0 +1,34 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from exiffield.facets import rebuild_facets
+from exiffield.fields import get_exif_fields
+
+
+class Command(BaseCommand):
+    help = 'Recalculate the facets of denormalized exif values.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models',
+            nargs='*',
+            metavar='app_label.ModelName',
+            help='Models to rebuild, defaults to all models with facets.',
+        )
+
+    def handle(self, *args, **options):
+        if options['models']:
+            try:
+                models = [apps.get_model(label) for label in options['models']]
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e)) from e
+        else:
+            models = [
+                model
+                for model in apps.get_models()
+                if any(field.facets for field in get_exif_fields(model))
+            ]
+
+        for model in models:
+            rebuild_facets(model)
+            self.stdout.write(f'Rebuilt facets of {model._meta.label}')
@@ -0,0 +1,222 @@
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from django.core.files import File
+from django.db import models, transaction
+
+from . import facets
+from .fields import (
+    SIDECAR,
+    ExifField,
+    LazyExifQuerySet,
+    bulk_update_exif,
+    get_exif_fields,
+)
+from .getters import ExifType
+from .scheduler import Priority
+
+logger = logging.getLogger(__name__)
+
+
+class ExifQuerySet(LazyExifQuerySet):
+    """
+    QuerySet, which extracts exif data for bulk operations.
+
+    Bulk operations do not send any `pre_save` signals, hence `ExifField`s
+    would neither be extracted nor denormalized.
+    Exif data of model instances is decoded on first access.
+    """
+
+    def _update_exif(self, objs: Sequence[models.Model]) -> None:
+        """
+        Extract and denormalize exif data for all given objects at once.
+        """
+        bulk_update_exif(self.model, objs)
+        for field in get_exif_fields(self.model):
+            for obj in objs:
+                field.denormalize_exif(obj)
+
+    def _save_facets(
+        self,
+        objs: Sequence[models.Model],
+        created: bool = False,
+        update_fields: Optional[Sequence[str]] = None,
+    ) -> None:
+        """
+        Update the facet counts with the changes of all given objects at once.
+        """
+        for field in get_exif_fields(self.model):
+            if not field.facets:
+                continue
+
+            changes: Dict[str, Counter] = {}
+            for obj in objs:
+                obj_changes = field.get_facet_changes(obj, created, update_fields)
+                for facet_field, counts in obj_changes.items():
+                    changes.setdefault(facet_field, Counter()).update(counts)
+
+            for facet_field, counts in changes.items():
+                facets.update_facets(self.model, facet_field, counts)
+
+    def bulk_create(
+        self,
+        objs: Iterable[models.Model],
+        *args,
+        **kwargs,
+    ) -> List[models.Model]:
+        """
+        Extract exif data of all objects before inserting them.
+        """
+        objs = list(objs)
+        self._update_exif(objs)
+        created = super().bulk_create(objs, *args, **kwargs)
+
+        # `bulk_create(objs, batch_size, ignore_conflicts)`
+        if kwargs.get('ignore_conflicts', len(args) > 1 and args[1]):
+            # it is unknown, which objects have been inserted
+            logger.warning(
+                'Skipped storing sidecars and facets of %s, since conflicts are '
+                'ignored by `bulk_create`',
+                self.model.__name__,
+            )
+            return created
+
+        # sidecar models can only be created, once the primary keys are known
+        for field in get_exif_fields(self.model):
+            sidecar_model = field.sidecar_model
+            if sidecar_model is None:
+                continue
+
+            sidecars = []
+            for obj in created:
+                if obj.pk is None:
+                    logger.warning(
+                        'Could not store exif of %s, since the database does not '
+                        'return primary keys for `bulk_create`',
+                        obj,
+                    )
+                    continue
+                sidecars.append(field.get_sidecar(obj))
+            sidecar_model._default_manager.using(self.db).bulk_create(sidecars)
+
+        self._save_facets(created, created=True)
+        return created
+
+    def bulk_update(
+        self,
+        objs: Iterable[models.Model],
+        fields: Sequence[str],
+        *args,
+        **kwargs,
+    ) -> Any:
+        """
+        Extract exif data of all objects, if any source field is updated.
+        """
+        objs = list(objs)
+        fields = list(fields)
+        exif_fields = [
+            field
+            for field in get_exif_fields(self.model)
+            if field.sync and field.source in fields
+        ]
+        if exif_fields:
+            self._update_exif(objs)
+            for field in exif_fields:
+                fieldnames = list(field.denormalized_fields)
+                if field.storage != SIDECAR:
+                    fieldnames.append(field.name)
+                fields.extend(name for name in fieldnames if name not in fields)
+        result = super().bulk_update(objs, fields, *args, **kwargs)
+
+        for field in exif_fields:
+            if field.sidecar_model is not None:
+                for obj in objs:
+                    field.save_sidecar(obj)
+
+        self._save_facets(objs, update_fields=fields)
+        return result
+
+    def update(self, **kwargs) -> int:
+        """
+        Extract exif data once, if the source field is set to a new file.
+        """
+        fields = [
+            field
+            for field in get_exif_fields(self.model)
+            if field.sync and kwargs.get(field.source)
+            # e.g. an expression, which cannot be resolved without the database
+            and isinstance(kwargs[field.source], (str, File))
+        ]
+        if fields:
+            # use a temporary instance to extract the exif data
+            obj = self.model(**{field.source: kwargs[field.source] for field in fields})
+            bulk_update_exif(self.model, [obj], priority=Priority.BULK)
+
+        sidecars: Dict[ExifField, ExifType] = {}
+        for field in fields:
+            kwargs[field.name] = getattr(obj, field.name)
+            kwargs.update(field.get_denormalized_values(obj))
+            if field.sidecar_model is not None:
+                sidecars[field] = kwargs.pop(field.name)
+
+        with transaction.atomic(using=self.db):
+            facet_changes = self._get_facet_changes(kwargs)
+            if not sidecars:
+                rows = super().update(**kwargs)
+            else:
+                # the rows might not match the filter anymore after the update
+                pks = list(self.values_list('pk', flat=True))
+                rows = super().update(**kwargs)
+                self._update_sidecars(sidecars, pks)
+
+            for facet_field, counts in facet_changes.items():
+                facets.update_facets(self.model, facet_field, counts)
+        return rows
+
+    def _get_facet_changes(self, values: Dict[str, Any]) -> Dict[str, Counter]:
+        """
+        Return the changes of the facet counts, if the rows are updated with `values`.
+        """
+        changes: Dict[str, Counter] = {}
+        for field in get_exif_fields(self.model):
+            for facet_field, key_func in field.facets.items():
+                if facet_field not in values:
+                    continue
+
+                value = values[facet_field]
+                if isinstance(value, (models.Expression, models.F)):
+                    # the new values are only known to the database
+                    continue
+
+                counts: Counter = Counter()
+                counts.subtract(facets.count_keys(self, facet_field, key_func))
+                key = key_func(value)
+                if key is not None:
+                    counts[key] += self.count()
+                changes[facet_field] = counts
+        return changes
+
+    def _update_sidecars(
+        self,
+        sidecars: Dict[ExifField, ExifType],
+        pks: List[Any],
+    ) -> None:
+        """
+        Store the exif data in the sidecar models of the given rows.
+        """
+        for field, exif_data in sidecars.items():
+            sidecar_model = field.sidecar_model
+            assert sidecar_model is not None
+            sidecar_manager = sidecar_model._default_manager.using(self.db)
+            existing = set(
+                sidecar_manager.filter(pk__in=pks).values_list('pk', flat=True)
+            )
+            sidecar_manager.filter(pk__in=existing).update(data=exif_data)
+            sidecar_manager.bulk_create(
+                sidecar_model(pk=pk, data=exif_data) for pk in pks if pk not in existing
+            )
+
+
+class ExifManager(models.Manager.from_queryset(ExifQuerySet)):  # type: ignore
+    pass
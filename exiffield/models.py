@@ -0,0 +1,18 @@
+from django.db import models
+
+
+class ExifFacet(models.Model):
+    """
+    Number of objects per value of a denormalized field.
+    """
+
+    model = models.CharField(max_length=100)
+    field = models.CharField(max_length=100)
+    value = models.CharField(max_length=255)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [('model', 'field', 'value')]
+
+    def __str__(self) -> str:
+        return f'{self.model}.{self.field}={self.value}: {self.count}'
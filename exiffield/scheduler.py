@@ -0,0 +1,134 @@
+import threading
+from contextlib import contextmanager
+from enum import Enum
+from typing import Dict, Generator, Optional
+
+from django.conf import settings
+
+from .exceptions import ExifError
+
+
+class Priority(Enum):
+    INTERACTIVE = 'interactive'
+    BULK = 'bulk'
+
+
+DEFAULT_LIMITS = {
+    Priority.INTERACTIVE.value: 8,
+    Priority.BULK.value: 2,
+}
+DEFAULT_INTERACTIVE_TIMEOUT = 30.0
+
+
+class Scheduler:
+    """
+    Limit the number of concurrent `exiftool` processes per priority.
+
+    Bulk work is paused as long as `pause_threshold` interactive requests are
+    waiting for a free slot. If `bulk_timeout` is set, bulk work waiting for
+    longer is shed by raising an `ExifError`. Interactive work is shed after
+    waiting `interactive_timeout` seconds, so that leaked slots cannot block
+    saving models forever.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        pause_threshold: int = 1,
+        bulk_timeout: Optional[float] = None,
+        interactive_timeout: Optional[float] = DEFAULT_INTERACTIVE_TIMEOUT,
+    ) -> None:
+        limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.limits = {priority: limits[priority.value] for priority in Priority}
+        self.pause_threshold = pause_threshold
+        self.bulk_timeout = bulk_timeout
+        self.interactive_timeout = interactive_timeout
+
+        self.running = {priority: 0 for priority in Priority}
+        self.waiting = {priority: 0 for priority in Priority}
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_settings(cls) -> 'Scheduler':
+        return cls(
+            limits=getattr(settings, 'EXIFFIELD_CONCURRENCY', None),
+            pause_threshold=getattr(settings, 'EXIFFIELD_BULK_PAUSE_THRESHOLD', 1),
+            bulk_timeout=getattr(settings, 'EXIFFIELD_BULK_TIMEOUT', None),
+            interactive_timeout=getattr(
+                settings,
+                'EXIFFIELD_INTERACTIVE_TIMEOUT',
+                DEFAULT_INTERACTIVE_TIMEOUT,
+            ),
+        )
+
+    def _can_run(self, priority: Priority) -> bool:
+        if self.running[priority] >= self.limits[priority]:
+            return False
+        if priority is Priority.BULK:
+            # pause bulk work while interactive work is queued
+            return self.waiting[Priority.INTERACTIVE] < self.pause_threshold
+        return True
+
+    @contextmanager
+    def slot(self, priority: Priority) -> Generator[None, None, None]:
+        """
+        Wait for a free slot of the given priority.
+        """
+        if priority is Priority.BULK:
+            timeout = self.bulk_timeout
+        else:
+            timeout = self.interactive_timeout
+        with self._condition:
+            self.waiting[priority] += 1
+            try:
+                if not self._condition.wait_for(
+                    lambda: self._can_run(priority),
+                    timeout=timeout,
+                ):
+                    raise ExifError(f'Extraction shed after waiting {timeout}s')
+            finally:
+                self.waiting[priority] -= 1
+                # waiting bulk work might be able to continue
+                self._condition.notify_all()
+            self.running[priority] += 1
+
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def try_acquire(self, priority: Priority) -> bool:
+        """
+        Take a free slot of the given priority without waiting.
+
+        Return whether the slot has been taken, which needs to be released.
+        """
+        with self._condition:
+            if self.waiting[priority] or not self._can_run(priority):
+                # do not overtake queued work
+                return False
+            self.running[priority] += 1
+            return True
+
+    def release(self, priority: Priority) -> None:
+        """
+        Release a slot of the given priority.
+        """
+        with self._condition:
+            self.running[priority] -= 1
+            self._condition.notify_all()
+
+
+_scheduler: Optional[Scheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    """
+    Return the scheduler shared by all extractions of this process.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler.from_settings()
+        return _scheduler
@@ -0,0 +1,192 @@
+import logging
+import subprocess
+import threading
+import weakref
+from typing import IO, Any, List, Optional
+
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+
+from .exceptions import ExifError
+from .fields import get_exiftool_path, parse_exif
+from .getters import ExifType
+from .scheduler import Priority, Scheduler, get_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+def _stop(process: subprocess.Popen, scheduler: Scheduler) -> None:
+    """
+    Stop `exiftool`, if it is still running, and release the slot.
+    """
+    try:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+    finally:
+        scheduler.release(Priority.INTERACTIVE)
+
+
+class ExifSession:
+    """
+    Pipe the content of a file to `exiftool` while it is being received.
+    """
+
+    def __init__(self) -> None:
+        exiftool_path = get_exiftool_path()
+        if not exiftool_path:
+            raise ExifError('Could not find `exiftool`')
+
+        # uploads are not queued, the file is extracted on save instead
+        scheduler = get_scheduler()
+        if not scheduler.try_acquire(Priority.INTERACTIVE):
+            raise ExifError('No free slot to extract the upload')
+
+        try:
+            self.process = subprocess.Popen(
+                [exiftool_path, '-j', '-l', '-'],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+        except Exception:
+            scheduler.release(Priority.INTERACTIVE)
+            raise
+        # sessions, which are neither closed nor aborted, e.g. because the parser
+        # stopped, are stopped once they are garbage collected
+        self._stop = weakref.finalize(self, _stop, self.process, scheduler)
+        self.stdin: IO[bytes] = self.process.stdin  # type: ignore
+        self.output: List[bytes] = []
+
+        # read the output concurrently, otherwise `exiftool` might block
+        # while the content is still written, the thread must not refer to
+        # the session to keep it collectable
+        output = self.output
+        stdout: IO[bytes] = self.process.stdout  # type: ignore
+        self.reader = threading.Thread(
+            target=lambda: output.append(stdout.read()),
+            daemon=True,
+        )
+        self.reader.start()
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Pass the chunk to `exiftool`.
+        """
+        if self.stdin.closed:
+            return
+
+        try:
+            self.stdin.write(chunk)
+        except BrokenPipeError:
+            # exiftool stopped reading, e.g. as it already found all information
+            self.stdin.close()
+
+    def close(self) -> ExifType:
+        """
+        Wait for `exiftool` and return the extracted exif data.
+        """
+        try:
+            self.stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            self.reader.join()
+            self.process.wait()
+        finally:
+            self._stop()
+
+        exif_data = next(parse_exif(b''.join(self.output).splitlines(True)), {})
+        exif_data.pop('SourceFile', None)
+        return exif_data
+
+    def abort(self) -> None:
+        """
+        Stop `exiftool` without waiting for any result.
+        """
+        self._stop()
+        try:
+            self.stdin.close()
+        except BrokenPipeError:
+            pass
+        self.reader.join()
+
+
+class ExifUploadHandlerMixin:
+    """
+    Extract exif data of uploaded files while they are being received.
+
+    The exif data is attached as `exif` to the uploaded file, which is used
+    by `ExifField` instead of extracting it again.
+    """
+
+    exif_session: Optional[ExifSession] = None
+
+    def abort_exif_session(self) -> None:
+        """
+        Abort the extraction of a file, which has not been completed.
+
+        `MultiPartParser` neither completes skipped files nor files of a stopped
+        upload.
+        """
+        session, self.exif_session = self.exif_session, None
+        if session is not None:
+            session.abort()
+
+    def new_file(self, *args: Any, **kwargs: Any) -> None:
+        self.abort_exif_session()
+        super().new_file(*args, **kwargs)  # type: ignore
+
+    def receive_data_chunk(self, raw_data: bytes, start: int) -> Optional[bytes]:
+        remaining = super().receive_data_chunk(raw_data, start)  # type: ignore
+        if remaining is not None:
+            # the chunk has not been handled by this handler
+            return remaining
+
+        if self.exif_session is None and start == 0:
+            try:
+                self.exif_session = ExifSession()
+            except ExifError as e:
+                logger.info('Could not extract exif while uploading: %s', e)
+            except Exception:
+                logger.exception('Could not start exiftool')
+        if self.exif_session is not None:
+            self.exif_session.write(raw_data)
+        return None
+
+    def file_complete(self, file_size: int) -> Optional[UploadedFile]:
+        file_ = super().file_complete(file_size)  # type: ignore
+        session, self.exif_session = self.exif_session, None
+        if session is None:
+            return file_
+
+        if file_ is None:
+            session.abort()
+            return file_
+
+        try:
+            file_.exif = session.close()
+        except Exception:
+            logger.exception('Could not read metainformation from file: %s', file_)
+        return file_
+
+    def upload_interrupted(self) -> None:
+        self.abort_exif_session()
+        super().upload_interrupted()  # type: ignore
+
+    def upload_complete(self) -> Any:
+        self.abort_exif_session()
+        return super().upload_complete()  # type: ignore
+
+
+class ExifMemoryFileUploadHandler(ExifUploadHandlerMixin, MemoryFileUploadHandler):
+    pass
+
+
+class ExifTemporaryFileUploadHandler(
+    ExifUploadHandlerMixin,
+    TemporaryFileUploadHandler,
+):
+    pass
@@ -1,8 +1,11 @@
 from pathlib import Path
 
 import django
+import pytest
 from django.conf import settings
 
+from benchmarks.loadtest import FAKE_EXIFTOOL
+
 
 def pytest_configure():
     """
@@ -14,8 +17,27 @@ def pytest_configure():
             'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
         },
         ROOT_URLCONF='tests.urls',
-        INSTALLED_APPS=('tests',),
+        INSTALLED_APPS=('exiffield', 'tests'),
         MEDIA_ROOT=tests_dir / 'media',
     )
 
     django.setup()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """
+    Store the files of each test in its own temporary directory.
+    """
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def fake_exiftool(mocker):
+    """
+    Use a fake `exiftool`, which reports the content of a file as camera model.
+    """
+    exiftool_path = str(FAKE_EXIFTOOL)
+    mocker.patch('shutil.which', return_value=exiftool_path)
+    return exiftool_path
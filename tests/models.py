@@ -2,6 +2,7 @@ from django.db import models
 
 from exiffield.fields import ExifField
 from exiffield.getters import exifgetter
+from exiffield.managers import ExifManager
 
 
 class Image(models.Model):
@@ -15,5 +16,53 @@ class Image(models.Model):
         denormalized_fields={'camera': exifgetter('Model')},
     )
 
+    objects = ExifManager()
+
+    class Meta:
+        app_label = 'tests'
+
+
+class Photo(models.Model):
+    image = models.ImageField()
+    thumbnail = models.ImageField()
+    exif = ExifField(source='image')
+    thumbnail_exif = ExifField(source='thumbnail')
+
+    class Meta:
+        app_label = 'tests'
+
+
+class SidecarImage(models.Model):
+    image = models.ImageField()
+    camera = models.CharField(
+        editable=False,
+        max_length=100,
+    )
+    exif = ExifField(
+        source='image',
+        denormalized_fields={'camera': exifgetter('Model')},
+        storage='sidecar',
+    )
+
+    objects = ExifManager()
+
+    class Meta:
+        app_label = 'tests'
+
+
+class GalleryImage(models.Model):
+    image = models.ImageField()
+    camera = models.CharField(
+        editable=False,
+        max_length=100,
+    )
+    exif = ExifField(
+        source='image',
+        denormalized_fields={'camera': exifgetter('Model')},
+        facets=['camera'],
+    )
+
+    objects = ExifManager()
+
     class Meta:
         app_label = 'tests'
@@ -0,0 +1,43 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.loadtest import FAKE_EXIFTOOL, percentile
+
+
+@pytest.mark.parametrize(
+    'percent, value',
+    [(50, 5), (95, 10), (99, 10), (10, 1)],
+)
+def test_percentile(percent, value):
+    assert percentile(list(range(10, 0, -1)), percent) == value
+
+
+def run_fake_exiftool(env):
+    return subprocess.run(
+        [sys.executable, str(FAKE_EXIFTOOL), '-j', '-l', '-'],
+        input=b'content',
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+    )
+
+
+def test_fake_exiftool():
+    process = run_fake_exiftool({'FAKE_EXIFTOOL_TAGS': '3'})
+
+    assert process.returncode == 0
+    [exif] = json.loads(process.stdout)
+    assert exif['Model']['val'] == 'content'
+    assert {'Tag0', 'Tag1', 'Tag2'} < set(exif)
+
+
+def test_fake_exiftool_failure():
+    process = run_fake_exiftool({'FAKE_EXIFTOOL_FAILURE_RATE': '1'})
+
+    assert process.returncode == 1
+    assert json.loads(process.stdout) == [
+        {'SourceFile': '-', 'Error': 'File format error'},
+    ]
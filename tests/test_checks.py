@@ -1,6 +1,7 @@
 import pytest
 from django.db import models
 
+from benchmarks.loadtest import FAKE_EXIFTOOL
 from exiffield.fields import ExifField
 
 
@@ -115,3 +116,54 @@ def test_valid_definition(mocked_which):
 
     errors = Image.check()
     assert len(errors) == 0
+
+
+@pytest.mark.django_db
+def test_facets(mocked_which, settings):
+    """
+    Test checks for facets.
+    """
+
+    class Image(models.Model):
+        image = models.ImageField()
+        camera = models.CharField(editable=False, max_length=100)
+        datetaken = models.DateTimeField(editable=False)
+        exif = ExifField(
+            source='image',
+            denormalized_fields={'camera': lambda exif: ''},
+            facets=['camera', 'datetaken'],
+        )
+
+        class Meta:
+            app_label = 'exiffield-facets'
+
+    # facet field is not denormalized
+    errors = Image.check()
+    assert [error.id for error in errors] == ['exiffield.E011'], errors
+
+    # `exiffield` is not installed
+    settings.INSTALLED_APPS = ['tests']
+    errors = Image.check()
+    assert [error.id for error in errors] == ['exiffield.E010', 'exiffield.E011']
+
+
+@pytest.mark.django_db
+def test_exiftool_setting(settings):
+    """
+    Test checks for the executable set in `EXIFFIELD_EXIFTOOL`.
+    """
+
+    class Image(models.Model):
+        image = models.ImageField()
+        exif = ExifField(source='image')
+
+        class Meta:
+            app_label = 'exiffield-exiftool-setting'
+
+    settings.EXIFFIELD_EXIFTOOL = str(FAKE_EXIFTOOL)
+    errors = Image.check()
+    assert len(errors) == 0, errors
+
+    settings.EXIFFIELD_EXIFTOOL = 'exiftool-not-installed'
+    errors = Image.check()
+    assert [error.id for error in errors] == ['exiffield.E001']
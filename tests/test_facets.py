@@ -0,0 +1,137 @@
+import datetime
+from enum import Enum
+from io import StringIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+
+from exiffield.facets import default_key, get_facets, month
+from exiffield.models import ExifFacet
+
+from .models import GalleryImage
+
+
+@pytest.fixture
+def gallery(fake_exiftool):
+    """
+    Create images taken with two different cameras.
+    """
+    images = []
+    for i, camera in enumerate(['Canon', 'Canon', 'Nikon']):
+        img = GalleryImage()
+        img.image = SimpleUploadedFile(f'image{i}.jpg', camera.encode())
+        img.save()
+        images.append(img)
+    return images
+
+
+def replace_file(img, content):
+    img.image = SimpleUploadedFile(img.image.name, content.encode())
+
+
+class Orientation(Enum):
+    LANDSCAPE = 'landscape'
+
+
+@pytest.mark.parametrize(
+    'value, key',
+    [
+        (None, None),
+        ('', None),
+        ('Canon', 'Canon'),
+        (3, '3'),
+        (Orientation.LANDSCAPE, 'landscape'),
+    ],
+)
+def test_default_key(value, key):
+    assert default_key(value) == key
+
+
+def test_month():
+    assert month(datetime.datetime(2018, 3, 4, 12, 0)) == '2018-03'
+    assert month(datetime.date(2018, 11, 1)) == '2018-11'
+    assert month(None) is None
+
+
+@pytest.mark.django_db
+def test_save(gallery):
+    assert get_facets(GalleryImage, 'camera') == {'Canon': 2, 'Nikon': 1}
+
+    # changed value
+    img = GalleryImage.objects.get(pk=gallery[0].pk)
+    replace_file(img, 'Nikon')
+    img.save()
+    gallery[0] = img
+    assert get_facets(GalleryImage, 'camera') == {'Canon': 1, 'Nikon': 2}
+
+    # unchanged value
+    img.save()
+    assert get_facets(GalleryImage, 'camera') == {'Canon': 1, 'Nikon': 2}
+
+
+@pytest.mark.django_db
+def test_save_deferred(gallery):
+    img = GalleryImage.objects.defer('camera').get(pk=gallery[0].pk)
+    img.save()
+    assert get_facets(GalleryImage, 'camera') == {'Canon': 2, 'Nikon': 1}
+
+
+@pytest.mark.django_db
+def test_delete(gallery):
+    gallery[0].delete()
+    assert get_facets(GalleryImage, 'camera') == {'Canon': 1, 'Nikon': 1}
+
+    GalleryImage.objects.filter(camera='Canon').delete()
+    assert get_facets(GalleryImage, 'camera') == {'Nikon': 1}
+
+
+@pytest.mark.django_db
+def test_bulk_create(fake_exiftool):
+    images = [
+        GalleryImage(image=SimpleUploadedFile(f'bulk{i}.jpg', camera.encode()))
+        for i, camera in enumerate(['Canon', 'Nikon', 'Nikon'])
+    ]
+    GalleryImage.objects.bulk_create(images)
+    assert get_facets(GalleryImage, 'camera') == {'Canon': 1, 'Nikon': 2}
+
+
+@pytest.mark.django_db
+def test_bulk_update(gallery):
+    images = list(GalleryImage.objects.order_by('pk'))
+    for img in images:
+        new_file = SimpleUploadedFile(f'new_{img.image.name}', b'Sony')
+        img.image.save(new_file.name, new_file, save=False)
+
+    GalleryImage.objects.bulk_update(images, ['image'])
+    assert get_facets(GalleryImage, 'camera') == {'Sony': 3}
+
+
+@pytest.mark.django_db
+def test_update(gallery):
+    GalleryImage.objects.filter(camera='Canon').update(camera='Sony')
+    assert get_facets(GalleryImage, 'camera') == {'Sony': 2, 'Nikon': 1}
+
+
+@pytest.mark.django_db
+def test_rebuild(gallery):
+    ExifFacet.objects.all().delete()
+    GalleryImage.objects.create(camera='Canon')
+    assert get_facets(GalleryImage, 'camera') == {'Canon': 1}
+
+    call_command('rebuild_exif_facets', 'tests.GalleryImage', stdout=StringIO())
+    assert get_facets(GalleryImage, 'camera') == {'Canon': 3, 'Nikon': 1}
+
+
+@pytest.mark.django_db
+def test_rebuild_unknown_model():
+    with pytest.raises(CommandError):
+        call_command('rebuild_exif_facets', 'tests.Unknown')
+
+
+@pytest.mark.django_db
+def test_bulk_create_ignore_conflicts(gallery):
+    duplicates = [GalleryImage(pk=img.pk, camera='Sony') for img in gallery]
+
+    GalleryImage.objects.bulk_create(duplicates, ignore_conflicts=True)
+    assert get_facets(GalleryImage, 'camera') == {'Canon': 2, 'Nikon': 1}
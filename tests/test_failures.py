@@ -0,0 +1,130 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from exiffield import failures, fields
+
+from .models import Image
+
+
+@pytest.fixture
+def corrupt_img(fake_exiftool):
+    """
+    Create an image instance with a file, which cannot be extracted.
+    """
+    return Image(image=SimpleUploadedFile('corrupt.jpg', b'corrupt content'))
+
+
+def get_failure(img):
+    return failures.get_failure(img.exif)
+
+
+@pytest.mark.django_db
+def test_skip_failed_file(mocker, corrupt_img):
+    img = corrupt_img
+    img.save()
+    assert set(img.exif) == {'ExifFailure', 'FileName', 'FileFingerprint'}
+    assert img.camera == ''
+    failure = get_failure(img)
+    assert failure['attempts'] == 1
+    assert not failure['permanent']
+    assert 'exit status 1' in failure['val']
+
+    mocker.spy(fields, 'iter_exif')
+    mocker.spy(fields, 'get_exif')
+    img.save()
+    assert fields.iter_exif.call_count == 0
+
+    img._meta.get_field('exif').update_exif(img)
+    assert fields.get_exif.call_count == 0
+
+    # extraction can be forced
+    img._meta.get_field('exif').update_exif(img, force=True)
+    assert fields.get_exif.call_count == 1
+    assert get_failure(img)['attempts'] == 2
+
+
+@pytest.mark.django_db
+def test_retry_failed_file(settings, corrupt_img):
+    settings.EXIFFIELD_RETRY_DELAY = 0
+    settings.EXIFFIELD_MAX_ATTEMPTS = 2
+    img = corrupt_img
+
+    img.save()
+    assert get_failure(img)['attempts'] == 1
+
+    # retry, since the delay passed
+    img.save()
+    failure = get_failure(img)
+    assert failure['attempts'] == 2
+    assert failure['permanent']
+    assert failure['val'] == 'File format error'
+
+    img.save()
+    assert get_failure(img)['attempts'] == 2
+
+
+@pytest.mark.django_db
+def test_extract_changed_file(corrupt_img):
+    img = corrupt_img
+    img.save()
+
+    img.image = SimpleUploadedFile('corrupt.jpg', b'content')
+    img.save()
+    assert img.exif['Model']['val'] == 'content'
+
+
+@pytest.mark.django_db
+def test_do_not_record_transient_failures(mocker, corrupt_img):
+    mocker.patch('shutil.which', return_value=None)
+    img = corrupt_img
+
+    img.save()
+    assert get_failure(img) is None
+
+
+@pytest.mark.django_db
+def test_missing_remote_file(mocker, fake_exiftool):
+    img = Image.objects.create(image='missing.jpg')
+    storage = img.image.storage
+    mocker.patch.object(storage, 'path', side_effect=NotImplementedError)
+    mocker.patch.object(storage, 'open', side_effect=FileNotFoundError)
+    mocker.patch.object(storage, 'size', side_effect=FileNotFoundError)
+
+    # the failure is transient, since the file cannot be fingerprinted
+    img._meta.get_field('exif').update_exif(img, force=True)
+    img.save()
+    assert get_failure(img) is None
+
+
+@pytest.mark.django_db
+def test_failure_is_stored(mocker, corrupt_img):
+    corrupt_img.save()
+    mocker.spy(fields, 'iter_exif')
+
+    # the failure is known to other processes
+    img = Image.objects.get(pk=corrupt_img.pk)
+    img.save()
+    assert fields.iter_exif.call_count == 0
+    assert get_failure(img)['attempts'] == 1
+
+
+@pytest.mark.parametrize(
+    'exif_data, failure',
+    [
+        ({}, 'exiftool did not return any exif data'),
+        ({'SourceFile': '-', 'Error': 'File format error'}, 'File format error'),
+        (
+            {'ExifToolVersion': {'val': 12}, 'Error': {'val': 'Unknown file type'}},
+            'Unknown file type',
+        ),
+        # tags have been extracted despite the error
+        ({'Error': 'Truncated file', 'Model': {'val': 'A'}}, None),
+    ],
+)
+def test_check_exif(exif_data, failure):
+    result = fields._check_exif(exif_data)
+    if failure is None:
+        assert result is exif_data
+    else:
+        assert isinstance(result, fields.ExifFailure)
+        assert result.reason == failure
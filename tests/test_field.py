@@ -1,14 +1,19 @@
+import copy
+import json
 import os
+import pickle
+import threading
 from pathlib import Path
 
 import pytest
 from django.conf import settings
+from django.core.files.base import ContentFile
 from django.core.files.storage import FileSystemStorage
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from exiffield import fields
+from exiffield import failures, fields
 
-from .models import Image
+from .models import Image, Photo
 
 DIR = Path(__file__).parent
 IMAGE_NAME = 'P1240157.JPG'
@@ -120,13 +125,15 @@ def test_unsupported_file():
         img.image.name = str(media_image_path)
         img.image._committed = False
 
-        # do not fail when saving
+        # do not fail when saving, but remember the failure
         img.save()
-        assert img.exif == {}
+        assert set(img.exif) == {failures.FAILURE_KEY, 'FileName', 'FileFingerprint'}
+        assert failures.get_failure(img.exif)['attempts'] == 1
 
-        # do not fail when saving and file is already saved to storage
+        # do not fail when saving and file is already saved to storage,
+        # the extraction is not retried before `retry_at`
         img.save()
-        assert img.exif == {}
+        assert failures.get_failure(img.exif)['attempts'] == 1
 
     finally:
         # cleanup
@@ -288,6 +295,326 @@ def test_denormalization_invalid_exif(img, caplog):
     assert img.camera == ''
 
 
+@pytest.fixture
+def fake_img(fake_exiftool):
+    """
+    Create an unsaved image instance with fake content.
+    """
+    img = Image()
+    img.image.file = SimpleUploadedFile('fake.jpg', b'content')
+    img.image.name = 'fake.jpg'
+    img.image._committed = False
+    return img
+
+
+def rename(file_, name):
+    """
+    Rename the file within the storage, similar to a remote storage.
+    """
+    new_path = Path(file_.storage.path(name))
+    os.rename(file_.path, new_path)
+    file_.name = name
+
+
+@pytest.mark.django_db
+def test_exif_should_contain_fingerprint(fake_img):
+    img = fake_img
+    img.save()
+
+    # the modification time is recorded, once the file has been stored
+    fingerprint = {
+        'desc': 'File Fingerprint',
+        'num': len(b'content'),
+        'val': img.image.storage.get_modified_time(img.image.name).isoformat(),
+        'checksum': '040f06fd774092478d450774f5ba30c5da78acc8',
+    }
+    assert img.exif['FileFingerprint'] == fingerprint
+    assert Image.objects.get(pk=img.pk).exif['FileFingerprint'] == fingerprint
+
+
+@pytest.mark.django_db
+def test_file_renamed_by_storage(mocker, fake_exiftool):
+    Image.objects.create(image=SimpleUploadedFile('image.jpg', b'content'))
+    img = Image.objects.create(image=SimpleUploadedFile('image.jpg', b'content'))
+    assert img.image.name != 'image.jpg'
+    assert img.exif['FileName']['val'] == img.image.name
+
+    mocker.spy(fields, 'get_checksum')
+    mocker.spy(fields, 'iter_exif')
+    img = Image.objects.get(pk=img.pk)
+    img.save()
+    assert fields.iter_exif.call_count == 0
+    assert fields.get_checksum.call_count == 0
+
+
+@pytest.mark.django_db
+def test_fingerprint_of_stored_file(mocker, fake_img):
+    fake_img.save()
+    img = Image(image=fake_img.image.name)
+    mocker.spy(fields, 'get_checksum')
+    img.save()
+
+    # stored files are not read to calculate a fingerprint
+    assert fields.get_checksum.call_count == 0
+    assert img.exif['FileFingerprint'] == {
+        'desc': 'File Fingerprint',
+        'num': len(b'content'),
+        'val': img.image.storage.get_modified_time(img.image.name).isoformat(),
+    }
+
+    rename(img.image, 'renamed.jpg')
+    img.save()
+    assert fields.get_checksum.call_count == 0
+    assert img.exif['FileName']['val'] == 'renamed.jpg'
+
+
+@pytest.mark.django_db
+def test_do_not_reextract_exif_if_file_is_renamed(mocker, fake_img):
+    img = fake_img
+    img.save()
+    mocker.spy(fields, 'iter_exif')
+
+    rename(img.image, 'renamed.jpg')
+    img.save()
+    assert fields.iter_exif.call_count == 0
+    assert img.exif['FileName']['val'] == 'renamed.jpg'
+
+
+@pytest.mark.django_db
+def test_reextract_exif_if_renamed_file_differs(fake_img):
+    img = fake_img
+    img.save()
+    assert img.exif['Model']['val'] == 'content'
+
+    rename(img.image, 'renamed.jpg')
+    with open(img.image.path, 'wb') as fh:
+        fh.write(b'CONTENT')  # same size, different content
+    img.save()
+    assert img.exif['Model']['val'] == 'CONTENT'
+    assert img.exif['FileName']['val'] == 'renamed.jpg'
+
+
+def test_parse_exif_incrementally():
+    lines = iter([b'[{\n', b'  "Model": "A"\n', b'},\n', b'{\n', b'  "Model": "B"\n'])
+    parser = fields.parse_exif(lines)
+
+    # the first object is available before the output is complete
+    assert next(parser) == {'Model': 'A'}
+    with pytest.raises(json.JSONDecodeError):
+        next(parser)
+
+
+def test_parse_exif_compact():
+    assert list(fields.parse_exif([b'[{"Model": "A"},{"Model": "B"}]'])) == [
+        {'Model': 'A'},
+        {'Model': 'B'},
+    ]
+    assert list(fields.parse_exif([b'[]'])) == []
+
+
+def test_iter_exif(mocker, fake_exiftool, tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f'{i}.jpg'
+        path.write_bytes(f'content {i}'.encode())
+        paths.append(path)
+    missing = tmp_path / 'missing.jpg'
+    mocker.spy(fields.subprocess, 'Popen')
+
+    results = list(fields.iter_exif([*paths, missing], chunk_size=2))
+
+    # one exiftool process per chunk
+    assert fields.subprocess.Popen.call_count == 2
+    assert results == [
+        (
+            paths[0],
+            {
+                'Model': {'desc': 'Camera Model Name', 'val': 'content 0'},
+                'FileName': {'desc': 'File Name', 'val': '0.jpg'},
+            },
+        ),
+        (
+            paths[1],
+            {
+                'Model': {'desc': 'Camera Model Name', 'val': 'content 1'},
+                'FileName': {'desc': 'File Name', 'val': '1.jpg'},
+            },
+        ),
+        (
+            paths[2],
+            {
+                'Model': {'desc': 'Camera Model Name', 'val': 'content 2'},
+                'FileName': {'desc': 'File Name', 'val': '2.jpg'},
+            },
+        ),
+        (missing, {}),
+    ]
+    # files missing from the output are not recorded as failures
+    assert results[-1][1].transient
+
+
+def test_iter_exif_relative_path(fake_exiftool, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    Path('-dash.jpg').write_bytes(b'dash content')
+
+    # a leading dash is not read as an option of exiftool
+    [(path, exif_data)] = fields.iter_exif(['-dash.jpg'])
+
+    assert path == '-dash.jpg'
+    assert exif_data['Model']['val'] == 'dash content'
+
+
+def test_iter_exif_shared_path(fake_exiftool, tmp_path):
+    path = tmp_path / 'shared.jpg'
+    path.write_bytes(b'shared content')
+
+    results = list(fields.iter_exif([path, str(path)]))
+
+    assert [exif_data['Model']['val'] for _, exif_data in results] == [
+        'shared content',
+        'shared content',
+    ]
+    # files must not share the same dictionary
+    assert results[0][1] is not results[1][1]
+
+
+def test_iter_exif_remote_backend(mocker, fake_exiftool):
+    img = Image(image='fake.jpg')
+    storage = img.image.storage
+    mocker.patch.object(storage, 'path', side_effect=NotImplementedError)
+    mocker.patch.object(storage, 'open', return_value=ContentFile(b'content'))
+
+    [(file_, exif_data)] = fields.iter_exif([img.image])
+    assert file_ is img.image
+    assert exif_data['Model']['val'] == 'content'
+
+
+@pytest.fixture
+def stored_img(fake_img):
+    """
+    Return an image, which has been loaded from the database.
+    """
+    fake_img.save()
+    return Image.objects.get(pk=fake_img.pk)
+
+
+@pytest.mark.django_db
+def test_lazy_exif(stored_img):
+    img = stored_img
+    exif_data = img.__dict__['exif']
+    assert isinstance(exif_data, fields.LazyExif)
+    assert not exif_data.is_loaded
+    assert img.camera == 'content'
+
+    # the exif data is decoded, once it is accessed
+    assert img.exif is exif_data
+    assert exif_data.is_loaded
+    assert img.exif['Model']['val'] == 'content'
+    assert isinstance(img.exif, dict)
+    assert img.exif == dict(img.exif)
+
+
+@pytest.mark.django_db
+def test_lazy_exif_json(stored_img):
+    img = stored_img
+    assert json.loads(json.dumps(img.exif)) == img.exif
+
+    # values are not deferred
+    [values] = Image.objects.values('exif')
+    assert json.loads(json.dumps(values))['exif']['Model']['val'] == 'content'
+    [exif_data] = Image.objects.values_list('exif', flat=True)
+    assert not isinstance(exif_data, fields.LazyExif)
+
+
+@pytest.mark.django_db
+def test_lazy_exif_is_saved_without_decoding(mocker, stored_img):
+    img = stored_img
+    mocker.spy(fields, 'iter_exif')
+
+    img.save()
+    assert not img.__dict__['exif'].is_loaded
+    assert fields.iter_exif.call_count == 0
+    assert Image.objects.get(pk=img.pk).exif == img.exif
+
+
+@pytest.mark.django_db
+def test_lazy_exif_save_nested_change(stored_img):
+    img = stored_img
+    img.exif['Model']['val'] = 'changed'
+
+    img.save()
+    assert Image.objects.get(pk=img.pk).exif['Model']['val'] == 'changed'
+
+
+@pytest.mark.django_db
+def test_lazy_exif_reextract_if_file_changes(stored_img):
+    img = stored_img
+    img.image = SimpleUploadedFile('other.jpg', b'other')
+
+    img.save()
+    assert img.exif['Model']['val'] == 'other'
+    assert img.camera == 'other'
+
+
+def test_lazy_exif_empty():
+    assert not fields.LazyExif('{}')
+    assert fields.LazyExif('{"Model": {}}')
+    assert fields.LazyExif('{}') == {}
+
+
+def test_lazy_exif_copy():
+    exif = fields.LazyExif('{"Model": {"val": "DMC-GX7"}}')
+    assert copy.deepcopy(exif) == {'Model': {'val': 'DMC-GX7'}}
+    assert pickle.loads(pickle.dumps(exif)) == {'Model': {'val': 'DMC-GX7'}}
+
+
+@pytest.fixture
+def photo():
+    """
+    Create an unsaved photo instance with two uncommitted files attached.
+    """
+    photo = Photo()
+    for fieldname in ['image', 'thumbnail']:
+        file_ = getattr(photo, fieldname)
+        file_.file = SimpleUploadedFile(f'{fieldname}.jpg', b'content')
+        file_.name = f'{fieldname}.jpg'
+        file_._committed = False
+    return photo
+
+
+@pytest.mark.django_db
+def test_extract_multiple_fields_concurrently(mocker, photo):
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fake_get_exif(file_):
+        # both extractions have to run at the same time to pass the barrier
+        barrier.wait()
+        return json.dumps([{'Model': {'desc': 'Model', 'val': file_.name}}]).encode()
+
+    mocker.patch.object(fields, 'get_exif', side_effect=fake_get_exif)
+
+    photo.save()
+    assert fields.get_exif.call_count == 2
+    assert photo.exif['Model']['val'] == 'image.jpg'
+    assert photo.thumbnail_exif['Model']['val'] == 'thumbnail.jpg'
+
+
+@pytest.mark.django_db
+def test_extract_only_changed_fields(mocker, photo):
+    exif_json = json.dumps([{'Model': {'desc': 'Model', 'val': 'DMC-GX7'}}]).encode()
+    mocker.patch.object(fields, 'get_exif', return_value=exif_json)
+    photo.save()
+
+    photo.thumbnail.file = SimpleUploadedFile('new.jpg', b'content')
+    photo.thumbnail.name = 'new.jpg'
+    photo.thumbnail._committed = False
+    fields.get_exif.reset_mock()
+
+    photo.save()
+    assert fields.get_exif.call_count == 1
+    assert fields.get_exif.call_args[0][0].name == 'new.jpg'
+
+
 @pytest.mark.xfail
 def test_async():
     raise NotImplementedError()
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from exiffield import fields
+from exiffield.scheduler import Priority, Scheduler
+
+from .models import Image
+
+
+@pytest.fixture
+def images():
+    """
+    Create unsaved image instances with uncommitted files.
+    """
+    images = []
+    for i in range(3):
+        img = Image()
+        img.image = SimpleUploadedFile(f'image{i}.jpg', f'content {i}'.encode())
+        images.append(img)
+    return images
+
+
+@pytest.mark.django_db
+def test_bulk_create(mocker, fake_exiftool, images):
+    mocker.spy(fields, 'get_exif')
+    mocker.spy(fields.subprocess, 'Popen')
+    Image.objects.bulk_create(images)
+
+    # new files are extracted by a single process
+    assert fields.get_exif.call_count == 0
+    assert fields.subprocess.Popen.call_count == 1
+    for i, img in enumerate(Image.objects.order_by('image')):
+        assert img.exif['Model']['val'] == f'content {i}'
+        assert img.camera == f'content {i}'
+
+
+@pytest.mark.django_db
+def test_bulk_update(mocker, fake_exiftool, images):
+    Image.objects.bulk_create(images)
+    images = list(Image.objects.order_by('image'))
+    for i, img in enumerate(images):
+        # `bulk_update` does not store files, hence they need to be committed
+        new_file = SimpleUploadedFile(f'new_{img.image.name}', f'new {i}'.encode())
+        img.image.save(new_file.name, new_file, save=False)
+
+    mocker.spy(fields, 'iter_exif')
+    Image.objects.bulk_update(images, ['image'])
+
+    # committed files are extracted at once
+    assert fields.iter_exif.call_count == 1
+    for i, img in enumerate(Image.objects.order_by('image')):
+        assert img.exif['Model']['val'] == f'new {i}'
+        assert img.camera == f'new {i}'
+
+
+@pytest.mark.django_db
+def test_bulk_update_without_source(mocker, fake_exiftool, images):
+    Image.objects.bulk_create(images)
+    mocker.spy(fields, 'iter_exif')
+
+    Image.objects.bulk_update(Image.objects.all(), ['camera'])
+    assert fields.iter_exif.call_count == 0
+
+
+@pytest.mark.django_db
+def test_update(mocker, fake_exiftool, images):
+    Image.objects.bulk_create(images)
+    scheduler = Scheduler()
+    mocker.patch.object(fields, 'get_scheduler', return_value=scheduler)
+    mocker.spy(scheduler, 'slot')
+
+    Image.objects.update(image=images[0].image.name)
+
+    scheduler.slot.assert_called_once_with(Priority.BULK)
+
+    for img in Image.objects.all():
+        assert img.exif['Model']['val'] == 'content 0'
+        assert img.camera == 'content 0'
+
+
+@pytest.mark.django_db
+def test_bulk_create_shared_file(fake_exiftool, images):
+    images[0].save()
+    shared = [Image(image=images[0].image.name) for _ in range(2)]
+
+    Image.objects.bulk_create(shared)
+
+    for img in shared:
+        assert img.exif['Model']['val'] == 'content 0'
+    assert not img._meta.get_field('exif').is_failing(img)
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason='requires procfs')
+@pytest.mark.django_db
+def test_bulk_create_closes_stored_files(fake_exiftool, images):
+    for img in images:
+        img.save()
+    open_files = len(os.listdir('/proc/self/fd'))
+
+    Image.objects.bulk_create(Image(image=img.image.name) for img in images)
+    assert len(os.listdir('/proc/self/fd')) == open_files
@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from exiffield import fields
+from exiffield.exceptions import ExifError
+from exiffield.scheduler import Priority, Scheduler
+
+from .models import Image
+
+
+def hold_slot(scheduler, priority):
+    """
+    Acquire a slot in a separate thread until the returned event is set.
+    """
+    acquired, release = threading.Event(), threading.Event()
+
+    def run():
+        with scheduler.slot(priority):
+            acquired.set()
+            release.wait(timeout=5)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return acquired, release, thread
+
+
+def test_limit_per_priority():
+    scheduler = Scheduler(limits={'interactive': 1, 'bulk': 1})
+    acquired, release, _ = hold_slot(scheduler, Priority.INTERACTIVE)
+    assert acquired.wait(timeout=5)
+
+    # other priorities are not affected
+    with scheduler.slot(Priority.BULK):
+        assert scheduler.running[Priority.BULK] == 1
+
+    waiting, release_waiting, thread = hold_slot(scheduler, Priority.INTERACTIVE)
+    assert not waiting.wait(timeout=0.1)
+
+    release.set()
+    assert waiting.wait(timeout=5)
+    release_waiting.set()
+    thread.join()
+    assert scheduler.running == {Priority.INTERACTIVE: 0, Priority.BULK: 0}
+
+
+def test_pause_bulk_while_interactive_is_waiting():
+    scheduler = Scheduler(limits={'interactive': 1, 'bulk': 1}, bulk_timeout=0.1)
+    acquired, release, _ = hold_slot(scheduler, Priority.INTERACTIVE)
+    assert acquired.wait(timeout=5)
+    waiting, release_waiting, thread = hold_slot(scheduler, Priority.INTERACTIVE)
+
+    # bulk work is shed, since interactive work is queued
+    with pytest.raises(ExifError):
+        with scheduler.slot(Priority.BULK):
+            pass
+
+    release.set()
+    assert waiting.wait(timeout=5)
+    release_waiting.set()
+    thread.join()
+
+    # bulk work continues, once the queue is empty
+    with scheduler.slot(Priority.BULK):
+        pass
+
+
+@pytest.mark.django_db
+def test_shed_interactive_work(mocker, fake_exiftool):
+    scheduler = Scheduler(limits={'interactive': 1}, interactive_timeout=0.1)
+    mocker.patch.object(fields, 'get_scheduler', return_value=scheduler)
+    acquired, release, thread = hold_slot(scheduler, Priority.INTERACTIVE)
+    assert acquired.wait(timeout=5)
+
+    # the extraction is retried on the next save
+    img = Image(image=SimpleUploadedFile('image.jpg', b'content'))
+    img.save()
+    assert not img.exif
+
+    release.set()
+    thread.join()
+    img.save()
+    assert img.exif['Model']['val'] == 'content'
+
+
+@pytest.mark.django_db
+def test_priorities(mocker, fake_exiftool):
+    scheduler = Scheduler()
+    mocker.patch.object(fields, 'get_scheduler', return_value=scheduler)
+    mocker.spy(scheduler, 'slot')
+
+    img = Image(image=SimpleUploadedFile('interactive.jpg', b'content'))
+    img.save()
+    scheduler.slot.assert_called_once_with(Priority.INTERACTIVE)
+    scheduler.slot.reset_mock()
+
+    bulk_img = Image(image=SimpleUploadedFile('bulk.jpg', b'content'))
+    Image.objects.bulk_create([bulk_img])
+    scheduler.slot.assert_called_once_with(Priority.BULK)
@@ -0,0 +1,121 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+
+from .models import SidecarImage
+
+
+@pytest.fixture
+def sidecar_img(fake_exiftool):
+    """
+    Create a saved image instance, which stores its exif in a sidecar model.
+    """
+    img = SidecarImage(image=SimpleUploadedFile('sidecar.jpg', b'content'))
+    img.save()
+    return img
+
+
+@pytest.mark.django_db
+def test_sidecar_table():
+    with connection.cursor() as cursor:
+        columns = [
+            column.name
+            for column in connection.introspection.get_table_description(
+                cursor, SidecarImage._meta.db_table
+            )
+        ]
+    assert 'exif' not in columns
+    assert 'camera' in columns
+
+    sidecar_model = SidecarImage._meta.get_field('exif').sidecar_model
+    assert sidecar_model._meta.db_table == 'tests_sidecarimage_exif'
+
+
+@pytest.mark.django_db
+def test_sidecar_save(sidecar_img):
+    img = sidecar_img
+    assert img.exif['Model']['val'] == 'content'
+    assert img.camera == 'content'
+
+    sidecar_model = SidecarImage._meta.get_field('exif').sidecar_model
+    assert sidecar_model.objects.get(pk=img.pk).data['Model']['val'] == 'content'
+
+
+@pytest.mark.django_db
+def test_sidecar_load_on_access(django_assert_num_queries, sidecar_img):
+    with django_assert_num_queries(1):
+        img = SidecarImage.objects.get(pk=sidecar_img.pk)
+        assert img.camera == 'content'
+
+    with django_assert_num_queries(1):
+        assert img.exif['Model']['val'] == 'content'
+
+
+@pytest.mark.django_db
+def test_sidecar_prefetch(django_assert_num_queries, sidecar_img):
+    SidecarImage.objects.create()  # without exif
+
+    with django_assert_num_queries(2):
+        images = list(SidecarImage.objects.prefetch_related('exif_sidecar'))
+        assert [img.exif.get('Model') for img in images] == [
+            {'desc': 'Camera Model Name', 'val': 'content'},
+            None,
+        ]
+
+
+@pytest.mark.django_db
+def test_sidecar_save_unchanged(django_assert_num_queries, sidecar_img):
+    img = SidecarImage.objects.get(pk=sidecar_img.pk)
+    img.exif  # load exif from sidecar
+
+    # neither the exif data nor the sidecar is saved again
+    with django_assert_num_queries(1):
+        img.save()
+
+
+@pytest.mark.django_db
+def test_sidecar_save_without_access(django_assert_num_queries, sidecar_img):
+    img = SidecarImage.objects.get(pk=sidecar_img.pk)
+
+    # the sidecar is neither loaded nor saved
+    with django_assert_num_queries(1):
+        img.save()
+    assert 'exif' not in img.__dict__
+
+
+@pytest.mark.django_db
+def test_sidecar_not_created_without_exif():
+    SidecarImage.objects.create()
+    img = SidecarImage()
+    assert img.exif == {}
+    img.save()
+
+    sidecar_model = SidecarImage._meta.get_field('exif').sidecar_model
+    assert not sidecar_model.objects.exists()
+
+
+@pytest.mark.django_db
+def test_sidecar_save_after_read(django_assert_num_queries, sidecar_img):
+    img = SidecarImage.objects.get(pk=sidecar_img.pk)
+    assert img.exif['Model']['val'] == 'content'
+
+    # reading the exif data does not require to save the sidecar
+    with django_assert_num_queries(1):
+        img.save()
+
+    img.exif['Model']['val'] = 'changed'
+    img.save()
+    img = SidecarImage.objects.get(pk=sidecar_img.pk)
+    assert img.exif['Model']['val'] == 'changed'
+
+
+@pytest.mark.django_db
+def test_sidecar_update(sidecar_img):
+    other = SidecarImage.objects.create()
+
+    SidecarImage.objects.update(image=sidecar_img.image.name)
+
+    for img in [sidecar_img, other]:
+        img = SidecarImage.objects.get(pk=img.pk)
+        assert img.exif['Model']['val'] == 'content'
+        assert img.camera == 'content'
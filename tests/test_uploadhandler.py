@@ -0,0 +1,176 @@
+import gc
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadhandler import SkipFile, StopFutureHandlers, StopUpload
+from django.http.multipartparser import MultiPartParser
+
+from exiffield import fields, uploadhandler
+from exiffield.scheduler import Priority, Scheduler
+from exiffield.uploadhandler import (
+    ExifMemoryFileUploadHandler,
+    ExifTemporaryFileUploadHandler,
+)
+
+from .models import Image
+
+
+def upload(handler, content, chunk_size=4):
+    """
+    Pass the content to the upload handler, like `MultiPartParser`.
+    """
+    handler.handle_raw_input(None, {}, len(content), 'boundary')
+    try:
+        handler.new_file('image', 'upload.jpg', 'image/jpeg', len(content))
+    except StopFutureHandlers:
+        pass
+    for start in range(0, len(content), chunk_size):
+        handler.receive_data_chunk(content[start : start + chunk_size], start)
+    return handler.file_complete(len(content))
+
+
+def parse(handler, files):
+    """
+    Parse a multipart request uploading the given files using `MultiPartParser`.
+    """
+    body = b''.join(
+        b'--boundary\r\n'
+        + f'Content-Disposition: form-data; name="{name}"; filename="{name}"\r\n'.encode()
+        + b'Content-Type: image/jpeg\r\n\r\n'
+        + content
+        + b'\r\n'
+        for name, content in files
+    )
+    body += b'--boundary--\r\n'
+    meta = {
+        'CONTENT_TYPE': 'multipart/form-data; boundary=boundary',
+        'CONTENT_LENGTH': str(len(body)),
+    }
+    _, uploaded_files = MultiPartParser(meta, BytesIO(body), [handler]).parse()
+    return uploaded_files
+
+
+class InterruptingUploadHandler(ExifMemoryFileUploadHandler):
+    """
+    Skip or stop uploads after the first chunk, depending on the file name.
+    """
+
+    def receive_data_chunk(self, raw_data, start):
+        super().receive_data_chunk(raw_data, start)
+        if self.file_name.startswith('skip'):
+            raise SkipFile()
+        if self.file_name.startswith('stop'):
+            raise StopUpload()
+
+
+@pytest.fixture
+def scheduler(mocker):
+    scheduler = Scheduler(limits={'interactive': 1})
+    mocker.patch.object(uploadhandler, 'get_scheduler', return_value=scheduler)
+    return scheduler
+
+
+@pytest.mark.parametrize(
+    'handler_class',
+    [ExifMemoryFileUploadHandler, ExifTemporaryFileUploadHandler],
+)
+def test_extract_while_uploading(fake_exiftool, handler_class):
+    file_ = upload(handler_class(), b'uploaded content')
+
+    assert file_.exif == {
+        'Model': {'desc': 'Camera Model Name', 'val': 'uploaded content'},
+    }
+    file_.seek(0)
+    assert file_.read() == b'uploaded content'
+
+
+def test_skip_if_not_handled(fake_exiftool, settings):
+    settings.FILE_UPLOAD_MAX_MEMORY_SIZE = 1
+    handler = ExifMemoryFileUploadHandler()
+
+    assert upload(handler, b'uploaded content') is None
+    assert handler.exif_session is None
+
+
+@pytest.mark.django_db
+def test_use_extracted_exif(mocker, fake_exiftool):
+    file_ = upload(ExifTemporaryFileUploadHandler(), b'uploaded content')
+    mocker.spy(fields, 'get_exif')
+    mocker.spy(fields.subprocess, 'Popen')
+
+    img = Image(image=file_)
+    try:
+        img.save()
+    finally:
+        file_.close()
+
+    assert fields.get_exif.call_count == 0
+    assert fields.subprocess.Popen.call_count == 0
+    assert img.exif['Model']['val'] == 'uploaded content'
+    assert img.exif['FileName']['val'] == 'upload.jpg'
+    assert img.camera == 'uploaded content'
+
+
+@pytest.mark.django_db
+def test_failed_upload_extraction(fake_exiftool):
+    file_ = upload(ExifTemporaryFileUploadHandler(), b'corrupt content')
+
+    img = Image(image=file_)
+    try:
+        img.save()
+    finally:
+        file_.close()
+
+    assert 'Model' not in img.exif
+    assert img.exif['ExifFailure']['val'] == 'File format error'
+
+
+def test_upload_sessions_are_limited(fake_exiftool, scheduler):
+    first, second = ExifMemoryFileUploadHandler(), ExifMemoryFileUploadHandler()
+    first.handle_raw_input(None, {}, 100, 'boundary')
+    with pytest.raises(StopFutureHandlers):
+        first.new_file('image', 'first.jpg', 'image/jpeg', 100)
+    first.receive_data_chunk(b'first', 0)
+    assert scheduler.running[Priority.INTERACTIVE] == 1
+
+    # the upload is extracted on save instead
+    file_ = upload(second, b'second')
+    assert not hasattr(file_, 'exif')
+
+    first.file_complete(5)
+    assert scheduler.running[Priority.INTERACTIVE] == 0
+    assert upload(second, b'second').exif['Model']['val'] == 'second'
+    assert scheduler.running[Priority.INTERACTIVE] == 0
+
+
+def test_skipped_upload(fake_exiftool, scheduler):
+    files = parse(
+        InterruptingUploadHandler(),
+        [('skip.jpg', b'SKIPPED'), ('image.jpg', b'content')],
+    )
+
+    assert 'skip.jpg' not in files
+    assert files['image.jpg'].exif['Model']['val'] == 'content'
+    assert scheduler.running[Priority.INTERACTIVE] == 0
+
+
+def test_stopped_upload(fake_exiftool, scheduler):
+    files = parse(InterruptingUploadHandler(), [('stop.jpg', b'STOPPED')])
+
+    assert not files
+    assert scheduler.running[Priority.INTERACTIVE] == 0
+
+
+def test_abandoned_session(fake_exiftool, scheduler):
+    handler = ExifMemoryFileUploadHandler()
+    handler.handle_raw_input(None, {}, 100, 'boundary')
+    with pytest.raises(StopFutureHandlers):
+        handler.new_file('image', 'image.jpg', 'image/jpeg', 100)
+    handler.receive_data_chunk(b'content', 0)
+    process = handler.exif_session.process
+    assert scheduler.running[Priority.INTERACTIVE] == 1
+
+    del handler
+    gc.collect()
+    assert process.poll() is not None
+    assert scheduler.running[Priority.INTERACTIVE] == 0